@@ -0,0 +1,78 @@
+import click
+from src.services.search import rebuild_search_index
+from src.services.idempotency import purge_expired_keys
+from src.services.rollups import rebuild_rollups
+from src.services.stock_history import take_snapshot
+from src.services.valuation import rebuild_cost_layers
+from src.services.forecasting import (
+    suggest_reorder_points, DEFAULT_LOOKBACK_DAYS, DEFAULT_LEAD_TIME_DAYS, DEFAULT_SERVICE_LEVEL
+)
+from src.services.purchase_proposals import propose_purchase_orders, parse_target_multiplier, DEFAULT_TARGET_MULTIPLIER
+
+def register_commands(app):
+    """Enregistre les commandes CLI (flask --app src.main <commande>)"""
+    
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index_command():
+        """Reconstruit l'index plein texte des produits"""
+        if rebuild_search_index():
+            click.echo('Index de recherche reconstruit')
+        else:
+            click.echo('FTS5 indisponible : la recherche utilisera ilike', err=True)
+    
+    @app.cli.command('purge-idempotency-keys')
+    def purge_idempotency_keys_command():
+        """Supprime les clés d'idempotence expirées"""
+        click.echo(f'{purge_expired_keys()} clé(s) expirée(s) supprimée(s)')
+    
+    @app.cli.command('backfill-rollups')
+    def backfill_rollups_command():
+        """Recalcule les agrégats journaliers des ventes et achats livrés"""
+        click.echo(f'{rebuild_rollups()} ligne(s) d\'agrégat recalculée(s)')
+    
+    @app.cli.command('snapshot-stock')
+    def snapshot_stock_command():
+        """Enregistre un point de contrôle du stock (à planifier, par exemple chaque nuit)"""
+        taken_at, count = take_snapshot()
+        click.echo(f'Point de contrôle du {taken_at.isoformat()} : {count} produit(s)')
+    
+    @app.cli.command('rebuild-cost-layers')
+    def rebuild_cost_layers_command():
+        """Recalcule les couches de coût FIFO et le coût moyen pondéré depuis le journal"""
+        click.echo(f'{rebuild_cost_layers()} couche(s) de coût recalculée(s)')
+    
+    @app.cli.command('suggest-reorder-points')
+    @click.option('--lookback-days', default=DEFAULT_LOOKBACK_DAYS, show_default=True, help='Historique analysé (jours)')
+    @click.option('--lead-time-days', default=DEFAULT_LEAD_TIME_DAYS, show_default=True, help='Délai de réapprovisionnement (jours)')
+    @click.option('--service-level', default=DEFAULT_SERVICE_LEVEL, show_default=True, help='Taux de service visé')
+    @click.option('--apply', is_flag=True, help='Écrit les seuils (simulation sinon)')
+    def suggest_reorder_points_command(lookback_days, lead_time_days, service_level, apply):
+        """Calcule les seuils de réapprovisionnement à partir des sorties de stock"""
+        report = suggest_reorder_points(lookback_days, lead_time_days, service_level, apply=apply)
+        for change in report['changes']:
+            click.echo(f"{change['reference']}: {change['current_min_stock_level']} -> {change['suggested_min_stock_level']}")
+        click.echo(
+            f"{report['products_analyzed']} produit(s) analysé(s), {report['products_with_history']} avec historique, "
+            f"{len(report['changes'])} seuil(s) {'mis à jour' if apply else 'à modifier (simulation)'}"
+        )
+    
+    @app.cli.command('propose-purchase-orders')
+    @click.option('--target-multiplier', default=DEFAULT_TARGET_MULTIPLIER, show_default=True, help='Niveau visé en multiple du seuil de stock bas')
+    @click.option('--supplier-id', type=int, default=None, help='Limite les propositions à un fournisseur')
+    @click.option('--dry-run', is_flag=True, help='Affiche les propositions sans créer de commande')
+    def propose_purchase_orders_command(target_multiplier, supplier_id, dry_run):
+        """Crée les commandes d'achat de réapprovisionnement des produits en stock bas"""
+        try:
+            target_multiplier = parse_target_multiplier(target_multiplier)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint='--target-multiplier')
+        report = propose_purchase_orders(target_multiplier, supplier_id, dry_run=dry_run)
+        for proposal in report['proposals']:
+            click.echo(
+                f"{proposal.get('order_number', proposal['supplier_name'])}: "
+                f"{len(proposal['items'])} article(s), {proposal['total_amount']:.2f}"
+            )
+        click.echo(
+            f"{report['orders_count']} commande(s) {'proposée(s) (simulation)' if dry_run else 'créée(s)'}, "
+            f"{report['items_count']} produit(s), {len(report['skipped'])} ignoré(s)"
+        )
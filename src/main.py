@@ -6,11 +6,19 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from flask import Flask, send_from_directory
 from flask_cors import CORS
 from src.models import db
+from src.models.schema import upgrade_schema
+from src.services.search import ensure_search_index
+from src.services.rollups import ensure_rollups
+from src.services.valuation import ensure_cost_layers
+from src.services.precompute import init_precompute
+from src.commands import register_commands
 from src.routes.user import user_bp
 from src.routes.products import products_bp
 from src.routes.suppliers import suppliers_bp
 from src.routes.orders import orders_bp
 from src.routes.reports import reports_bp
+from src.routes.inventory import inventory_bp
+from src.routes.export import export_bp
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
@@ -24,6 +32,8 @@ app.register_blueprint(products_bp, url_prefix='/api')
 app.register_blueprint(suppliers_bp, url_prefix='/api')
 app.register_blueprint(orders_bp, url_prefix='/api')
 app.register_blueprint(reports_bp, url_prefix='/api')
+app.register_blueprint(inventory_bp, url_prefix='/api')
+app.register_blueprint(export_bp, url_prefix='/api')
 
 # uncomment if you need to use database
 app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
@@ -31,6 +41,13 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db.init_app(app)
 with app.app_context():
     db.create_all()
+    upgrade_schema()
+    ensure_search_index()
+    ensure_rollups()
+    ensure_cost_layers()
+
+register_commands(app)
+init_precompute(app)
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -6,8 +6,14 @@ db = SQLAlchemy()
 # Import de tous les modèles
 from .product import Product
 from .supplier import Supplier
-from .order import Order, OrderItem, OrderStatus, OrderType
+from .order import Order, OrderItem, OrderStatus, OrderType, OrderSequence
 from .stock_movement import StockMovement, MovementType
+from .cost_layer import CostLayer
+from .inventory_count import InventoryCount, InventoryCountLine, InventoryCountStatus
+from .stock_reservation import StockReservation, ReservationStatus
+from .idempotency_key import IdempotencyKey
+from .rollup import DailyOrderRollup, DailyProductRollup, DailySupplierRollup
+from .stock_snapshot import StockSnapshot
 
 # Export des modèles et enums
 __all__ = [
@@ -18,7 +24,19 @@ __all__ = [
     'OrderItem',
     'OrderStatus',
     'OrderType',
+    'OrderSequence',
     'StockMovement',
-    'MovementType'
+    'MovementType',
+    'CostLayer',
+    'InventoryCount',
+    'InventoryCountLine',
+    'InventoryCountStatus',
+    'StockReservation',
+    'ReservationStatus',
+    'IdempotencyKey',
+    'DailyOrderRollup',
+    'DailyProductRollup',
+    'DailySupplierRollup',
+    'StockSnapshot'
 ]
 
@@ -0,0 +1,141 @@
+from collections import defaultdict, deque
+from datetime import datetime
+from sqlalchemy import delete, insert, update
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+from . import db
+from .product import Product
+
+class CostLayer(db.Model):
+    """Couche de coût FIFO : quantité entrée à un coût unitaire donné et
+    quantité encore en stock. Les couches épuisées sont supprimées, la table
+    ne contient donc que le stock valorisé courant."""
+    __tablename__ = 'cost_layers'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    unit_cost = db.Column(db.Float, nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)  # Quantité entrée
+    remaining_quantity = db.Column(db.Integer, nullable=False)  # Quantité restant en stock
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_cost_layers_product_received', 'product_id', 'received_at', 'id'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'product_id': self.product_id,
+            'unit_cost': self.unit_cost,
+            'quantity': self.quantity,
+            'remaining_quantity': self.remaining_quantity,
+            'received_at': self.received_at.isoformat() if self.received_at else None
+        }
+    
+    @staticmethod
+    def record(rows):
+        """Répercute des mouvements de stock sur les couches FIFO et le coût
+        moyen pondéré des produits, dans la transaction courante.
+        
+        `rows` suit le format de StockMovement.build_row (product_id,
+        previous_stock, new_stock, unit_cost et created_at facultatifs), dans
+        l'ordre du journal. Une hausse de stock crée une couche au coût du
+        mouvement (à défaut : coût moyen courant, puis prix unitaire) ; une
+        baisse consomme les couches les plus anciennes.
+        """
+        if not rows:
+            return
+        product_ids = {row['product_id'] for row in rows}
+        issuing = {row['product_id'] for row in rows if row['new_stock'] < row['previous_stock']}
+        
+        costs = {
+            product_id: [average_cost, unit_price]
+            for product_id, average_cost, unit_price in db.session.query(
+                Product.id, Product.average_cost, Product.unit_price
+            ).filter(Product.id.in_(product_ids)).all()
+        }
+        layers = defaultdict(deque)
+        if issuing:
+            for layer_id, product_id, unit_cost, remaining in db.session.query(
+                CostLayer.id, CostLayer.product_id, CostLayer.unit_cost, CostLayer.remaining_quantity
+            ).filter(CostLayer.product_id.in_(issuing)).order_by(
+                CostLayer.product_id, CostLayer.received_at, CostLayer.id
+            ).all():
+                layers[product_id].append({'id': layer_id, 'unit_cost': unit_cost, 'remaining_quantity': remaining})
+        
+        averages = {product_id: cost[0] or 0.0 for product_id, cost in costs.items()}
+        created, touched = [], {}
+        for row in rows:
+            product_id = row['product_id']
+            average = apply_cost_movement(
+                product_id, layers[product_id], averages[product_id], row['previous_stock'], row['new_stock'],
+                row.get('unit_cost'), costs[product_id][1], row.get('created_at') or datetime.utcnow(),
+                created, touched
+            )
+            averages[product_id] = average
+        
+        new_layers = [layer for layer in created if layer['remaining_quantity'] > 0]
+        if new_layers:
+            db.session.execute(insert(CostLayer), [
+                {key: layer[key] for key in ('product_id', 'unit_cost', 'quantity', 'remaining_quantity', 'received_at')}
+                for layer in new_layers
+            ])
+        exhausted = [layer_id for layer_id, remaining in touched.items() if remaining <= 0]
+        if exhausted:
+            db.session.execute(delete(CostLayer).where(CostLayer.id.in_(exhausted)))
+        remaining = [{'id': layer_id, 'remaining_quantity': value} for layer_id, value in touched.items() if value > 0]
+        if remaining:
+            db.session.execute(update(CostLayer), remaining)
+        
+        changed = [
+            {'id': product_id, 'average_cost': average}
+            for product_id, average in averages.items()
+            if average != (costs[product_id][0] or 0.0)
+        ]
+        if changed:
+            db.session.execute(update(Product), changed)
+            for row in changed:
+                product = db.session.identity_map.get(identity_key(Product, row['id']))
+                if product is not None:
+                    set_committed_value(product, 'average_cost', row['average_cost'])
+    
+    def __repr__(self):
+        return f'<CostLayer {self.product_id} {self.remaining_quantity}/{self.quantity} @ {self.unit_cost}>'
+
+def apply_cost_movement(product_id, layers, average, previous_stock, new_stock, unit_cost, fallback_cost, moved_at, created, touched):
+    """Applique un mouvement à la file de couches d'un produit (en mémoire) et
+    retourne le nouveau coût moyen pondéré.
+    
+    Les couches créées sont ajoutées à `created` ; les quantités restantes des
+    couches existantes modifiées sont reportées dans `touched` (id -> reste).
+    """
+    delta = new_stock - previous_stock
+    if delta > 0:
+        if unit_cost is None:
+            unit_cost = average or fallback_cost or 0.0
+        layer = {
+            'id': None,
+            'product_id': product_id,
+            'unit_cost': unit_cost,
+            'quantity': delta,
+            'remaining_quantity': delta,
+            'received_at': moved_at
+        }
+        layers.append(layer)
+        created.append(layer)
+        on_hand = max(previous_stock, 0)
+        if new_stock > 0:
+            average = (on_hand * average + delta * unit_cost) / (on_hand + delta)
+    elif delta < 0:
+        to_issue = -delta
+        while to_issue > 0 and layers:
+            layer = layers[0]
+            taken = min(layer['remaining_quantity'], to_issue)
+            layer['remaining_quantity'] -= taken
+            to_issue -= taken
+            if layer['id'] is not None:
+                touched[layer['id']] = layer['remaining_quantity']
+            if layer['remaining_quantity'] <= 0:
+                layers.popleft()
+    return average
@@ -0,0 +1,16 @@
+from datetime import datetime
+from . import db
+
+class IdempotencyKey(db.Model):
+    """Réponse mémorisée d'une requête POST rejouable (en-tête Idempotency-Key)"""
+    __tablename__ = 'idempotency_keys'
+    
+    key = db.Column(db.String(100), primary_key=True)
+    endpoint = db.Column(db.String(100), nullable=False)
+    status_code = db.Column(db.Integer)  # NULL tant que la requête d'origine est en cours
+    response_body = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f'<IdempotencyKey {self.key} {self.endpoint}>'
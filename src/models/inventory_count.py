@@ -0,0 +1,48 @@
+from datetime import datetime
+from enum import Enum
+from . import db
+
+class InventoryCountStatus(Enum):
+    OPEN = "open"
+    COMMITTED = "committed"
+    CANCELLED = "cancelled"
+
+class InventoryCount(db.Model):
+    __tablename__ = 'inventory_counts'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.Enum(InventoryCountStatus), default=InventoryCountStatus.OPEN, nullable=False)
+    notes = db.Column(db.Text)
+    created_by = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    committed_at = db.Column(db.DateTime)
+    
+    def to_dict(self, lines_count=None):
+        return {
+            'id': self.id,
+            'status': self.status.value,
+            'notes': self.notes,
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'committed_at': self.committed_at.isoformat() if self.committed_at else None,
+            'lines_count': lines_count
+        }
+    
+    def __repr__(self):
+        return f'<InventoryCount {self.id} {self.status.value}>'
+
+class InventoryCountLine(db.Model):
+    __tablename__ = 'inventory_count_lines'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    count_id = db.Column(db.Integer, db.ForeignKey('inventory_counts.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    counted_quantity = db.Column(db.Integer, nullable=False)
+    counted_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('count_id', 'product_id', name='uq_inventory_count_lines_product'),
+    )
+    
+    def __repr__(self):
+        return f'<InventoryCountLine {self.product_id}={self.counted_quantity}>'
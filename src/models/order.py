@@ -1,5 +1,7 @@
 from datetime import datetime
 from enum import Enum
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
 from . import db
 
 class OrderStatus(Enum):
@@ -35,6 +37,10 @@ class Order(db.Model):
     # Relations
     order_items = db.relationship('OrderItem', backref='order', cascade='all, delete-orphan')
     
+    __table_args__ = (
+        db.Index('ix_orders_type_status_date', 'order_type', 'status', 'order_date'),
+    )
+    
     def calculate_total(self):
         """Calcule le montant total de la commande"""
         total = sum(item.quantity * item.unit_price for item in self.order_items)
@@ -95,3 +101,33 @@ class OrderItem(db.Model):
     def __repr__(self):
         return f'<OrderItem {self.product.name if self.product else "Unknown"} x{self.quantity}>'
 
+class OrderSequence(db.Model):
+    """Compteur de numéros de commande par préfixe journalier (ex. VTE-20250714)"""
+    __tablename__ = 'order_sequences'
+    
+    prefix = db.Column(db.String(20), primary_key=True)
+    last_value = db.Column(db.Integer, nullable=False, default=0)
+    
+    @staticmethod
+    def next_numbers(order_type, count=1):
+        """Réserve count numéros consécutifs pour le type de commande
+        (UPDATE atomique du compteur du jour)"""
+        prefix = f"{'ACH' if order_type == OrderType.PURCHASE else 'VTE'}-{datetime.now().strftime('%Y%m%d')}"
+        
+        while True:
+            statement = update(OrderSequence).where(OrderSequence.prefix == prefix).values(
+                last_value=OrderSequence.last_value + count
+            ).returning(OrderSequence.last_value)
+            last_value = db.session.execute(statement, execution_options={'synchronize_session': False}).scalar()
+            if last_value is not None:
+                return [f'{prefix}-{value:05d}' for value in range(last_value - count + 1, last_value + 1)]
+            
+            # Premier numéro du jour : créer le compteur (un autre processus a pu le créer entre-temps)
+            try:
+                with db.session.begin_nested():
+                    db.session.add(OrderSequence(prefix=prefix, last_value=0))
+            except IntegrityError:
+                pass
+    
+    def __repr__(self):
+        return f'<OrderSequence {self.prefix}={self.last_value}>'
@@ -1,43 +1,96 @@
 from datetime import datetime
+from sqlalchemy import event
 from . import db
 
 class Product(db.Model):
     __tablename__ = 'products'
     
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), nullable=False, index=True)
     description = db.Column(db.Text)
     category = db.Column(db.String(50), nullable=False)
     reference = db.Column(db.String(50), unique=True, nullable=False)
     unit_price = db.Column(db.Float, nullable=False)
-    stock_quantity = db.Column(db.Integer, default=0)
+    stock_quantity = db.Column(db.Integer, default=0, index=True)
     min_stock_level = db.Column(db.Integer, default=10)
     supplier_id = db.Column(db.Integer, db.ForeignKey('suppliers.id'), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # Quantité réservée par les ventes en cours (disponible = stock - réservé)
+    reserved_quantity = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Indicateur stocké (stock_quantity <= min_stock_level), maintenu à chaque écriture
+    is_low_stock = db.Column(db.Boolean, nullable=False, default=False, server_default='0', index=True)
+    # Coût moyen pondéré des entrées, maintenu à chaque mouvement (voir CostLayer)
+    average_cost = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
+    # Classe ABC (A, B ou C) enregistrée par le rapport /reports/abc
+    abc_class = db.Column(db.String(1), index=True)
+    
+    __table_args__ = (
+        db.Index('ix_products_low_stock_quantity', 'is_low_stock', 'stock_quantity'),
+    )
+    
+    # Champs exposés par to_dict et colonnes nécessaires à leur calcul
+    SERIALIZABLE_FIELDS = {
+        'id': ('id',),
+        'name': ('name',),
+        'description': ('description',),
+        'category': ('category',),
+        'reference': ('reference',),
+        'unit_price': ('unit_price',),
+        'average_cost': ('average_cost',),
+        'stock_quantity': ('stock_quantity',),
+        'reserved_quantity': ('reserved_quantity',),
+        'available_quantity': ('stock_quantity', 'reserved_quantity'),
+        'min_stock_level': ('min_stock_level',),
+        'supplier_id': ('supplier_id',),
+        'supplier_name': ('supplier_id',),
+        'created_at': ('created_at',),
+        'updated_at': ('updated_at',),
+        'is_low_stock': ('is_low_stock',),
+        'abc_class': ('abc_class',)
+    }
     
     # Relations
     supplier = db.relationship('Supplier', backref='products')
     order_items = db.relationship('OrderItem', backref='product')
     stock_movements = db.relationship('StockMovement', backref='product')
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'description': self.description,
-            'category': self.category,
-            'reference': self.reference,
-            'unit_price': self.unit_price,
-            'stock_quantity': self.stock_quantity,
-            'min_stock_level': self.min_stock_level,
-            'supplier_id': self.supplier_id,
-            'supplier_name': self.supplier.name if self.supplier else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'is_low_stock': self.stock_quantity <= self.min_stock_level
-        }
+    def to_dict(self, fields=None):
+        """Sérialise le produit, éventuellement restreint à une liste de champs"""
+        if fields is None:
+            fields = self.SERIALIZABLE_FIELDS
+        return {field: self._serialize_field(field) for field in fields}
+    
+    def _serialize_field(self, field):
+        if field == 'supplier_name':
+            return self.supplier.name if self.supplier else None
+        if field == 'available_quantity':
+            return self.available_quantity
+        value = getattr(self, field)
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return value
+    
+    @property
+    def available_quantity(self):
+        """Quantité vendable : stock physique moins les réservations actives"""
+        return (self.stock_quantity or 0) - (self.reserved_quantity or 0)
+    
+    def refresh_low_stock(self):
+        """Recalcule l'indicateur de stock bas à partir du stock et du seuil"""
+        stock_quantity = self._value_or_default('stock_quantity')
+        min_stock_level = self._value_or_default('min_stock_level')
+        self.is_low_stock = stock_quantity <= min_stock_level
+    
+    def _value_or_default(self, name):
+        value = getattr(self, name)
+        return value if value is not None else self.__table__.c[name].default.arg
     
     def __repr__(self):
         return f'<Product {self.name}>'
 
+@event.listens_for(Product, 'before_insert')
+@event.listens_for(Product, 'before_update')
+def _refresh_low_stock(mapper, connection, product):
+    product.refresh_low_stock()
+
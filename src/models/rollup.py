@@ -0,0 +1,40 @@
+from . import db
+from .order import OrderType
+
+# Agrégats journaliers des commandes livrées, tenus à jour à chaque passage
+# au statut livré (ou retour depuis ce statut) dans la même transaction.
+
+class DailyOrderRollup(db.Model):
+    __tablename__ = 'daily_order_rollups'
+    
+    order_type = db.Column(db.Enum(OrderType), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    total_amount = db.Column(db.Float, nullable=False, default=0.0)
+    
+    def __repr__(self):
+        return f'<DailyOrderRollup {self.order_type.value} {self.day}>'
+
+class DailyProductRollup(db.Model):
+    __tablename__ = 'daily_product_rollups'
+    
+    order_type = db.Column(db.Enum(OrderType), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), primary_key=True)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    total_amount = db.Column(db.Float, nullable=False, default=0.0)
+    
+    def __repr__(self):
+        return f'<DailyProductRollup {self.order_type.value} {self.day} {self.product_id}>'
+
+class DailySupplierRollup(db.Model):
+    __tablename__ = 'daily_supplier_rollups'
+    
+    order_type = db.Column(db.Enum(OrderType), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    supplier_id = db.Column(db.Integer, db.ForeignKey('suppliers.id'), primary_key=True)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    total_amount = db.Column(db.Float, nullable=False, default=0.0)
+    
+    def __repr__(self):
+        return f'<DailySupplierRollup {self.order_type.value} {self.day} {self.supplier_id}>'
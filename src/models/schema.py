@@ -0,0 +1,53 @@
+from sqlalchemy import inspect, text
+from . import db
+
+# Initialisation des colonnes ajoutées à une base existante (requêtes exécutées dans l'ordre)
+BACKFILLS = {
+    ('products', 'is_low_stock'): (
+        'UPDATE products SET is_low_stock = (stock_quantity <= min_stock_level)',
+    ),
+    # Réservations des ventes encore ouvertes créées avant la gestion des réservations
+    ('products', 'reserved_quantity'): (
+        """INSERT INTO stock_reservations (order_id, order_item_id, product_id, quantity, status, created_at, updated_at)
+        SELECT order_items.order_id, order_items.id, order_items.product_id, order_items.quantity,
+               'ACTIVE', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+        FROM order_items JOIN orders ON orders.id = order_items.order_id
+        WHERE orders.order_type = 'SALE' AND orders.status IN ('PENDING', 'CONFIRMED', 'SHIPPED')
+          AND NOT EXISTS (SELECT 1 FROM stock_reservations WHERE stock_reservations.order_item_id = order_items.id)""",
+        """UPDATE products SET reserved_quantity = COALESCE((
+            SELECT SUM(quantity) FROM stock_reservations
+            WHERE stock_reservations.product_id = products.id AND stock_reservations.status = 'ACTIVE'
+        ), 0)"""
+    )
+}
+
+def upgrade_schema():
+    """Met à niveau une base existante : ajoute les colonnes et index déclarés
+    dans les modèles mais absents des tables créées par une version antérieure
+    (db.create_all ne crée que les tables manquantes)."""
+    engine = db.engine
+    inspector = inspect(engine)
+    ddl_compiler = engine.dialect.ddl_compiler(engine.dialect, None)
+    
+    with engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+                default = ddl_compiler.get_column_default_string(column)
+                if default is not None:
+                    ddl += f' DEFAULT {default}'
+                connection.execute(text(ddl))
+                for statement in BACKFILLS.get((table.name, column.name), ()):
+                    connection.execute(text(statement))
+            
+            existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(connection)
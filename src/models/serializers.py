@@ -0,0 +1,81 @@
+from collections import defaultdict
+from sqlalchemy import func, inspect
+from sqlalchemy.orm.attributes import set_committed_value
+from . import db
+from .product import Product
+from .supplier import Supplier
+from .order import OrderItem
+
+# Taille des listes IN (reste sous la limite de variables de SQLite)
+IN_CHUNK_SIZE = 500
+
+def _chunks(values):
+    values = list(values)
+    for start in range(0, len(values), IN_CHUNK_SIZE):
+        yield values[start:start + IN_CHUNK_SIZE]
+
+def _fetch_by_ids(model, ids):
+    """Charge des lignes par clé primaire en quelques requêtes IN"""
+    rows = {}
+    for chunk in _chunks(ids):
+        for row in model.query.filter(model.id.in_(chunk)).all():
+            rows[row.id] = row
+    return rows
+
+def _pending(instances, relation):
+    """Instances dont la relation n'est pas encore chargée"""
+    return [instance for instance in instances if relation in inspect(instance).unloaded]
+
+def preload_many_to_one(instances, relation, model, foreign_key):
+    """Renseigne une relation plusieurs-à-un pour toute une liste d'instances"""
+    pending = _pending(instances, relation)
+    ids = {getattr(instance, foreign_key) for instance in pending} - {None}
+    related = _fetch_by_ids(model, ids)
+    for instance in pending:
+        set_committed_value(instance, relation, related.get(getattr(instance, foreign_key)))
+
+def preload_order_items(orders):
+    """Charge les lignes de toutes les commandes et leurs produits en bloc"""
+    pending = _pending(orders, 'order_items')
+    items_by_order = defaultdict(list)
+    for chunk in _chunks(order.id for order in pending):
+        items = OrderItem.query.filter(OrderItem.order_id.in_(chunk)).order_by(OrderItem.id).all()
+        for item in items:
+            items_by_order[item.order_id].append(item)
+    for order in pending:
+        set_committed_value(order, 'order_items', items_by_order.get(order.id, []))
+    
+    items = [item for order in orders for item in order.order_items]
+    preload_many_to_one(items, 'product', Product, 'product_id')
+
+def supplier_products_counts(supplier_ids):
+    """Nombre de produits par fournisseur, en une requête agrégée"""
+    counts = {}
+    for chunk in _chunks(supplier_ids):
+        rows = db.session.query(Product.supplier_id, func.count(Product.id)).filter(
+            Product.supplier_id.in_(chunk)
+        ).group_by(Product.supplier_id).all()
+        counts.update(rows)
+    return counts
+
+def serialize_products(products, fields=None):
+    """Sérialise une liste de produits sans chargement paresseux ligne à ligne"""
+    if fields is None or 'supplier_name' in fields:
+        preload_many_to_one(products, 'supplier', Supplier, 'supplier_id')
+    return [product.to_dict(fields) for product in products]
+
+def serialize_suppliers(suppliers):
+    """Sérialise une liste de fournisseurs avec leur nombre de produits"""
+    counts = supplier_products_counts(supplier.id for supplier in suppliers)
+    return [supplier.to_dict(products_count=counts.get(supplier.id, 0)) for supplier in suppliers]
+
+def serialize_orders(orders):
+    """Sérialise une liste de commandes avec fournisseurs, lignes et produits"""
+    preload_many_to_one(orders, 'supplier', Supplier, 'supplier_id')
+    preload_order_items(orders)
+    return [order.to_dict() for order in orders]
+
+def serialize_movements(movements):
+    """Sérialise une liste de mouvements de stock avec leurs produits"""
+    preload_many_to_one(movements, 'product', Product, 'product_id')
+    return [movement.to_dict() for movement in movements]
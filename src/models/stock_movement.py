@@ -1,6 +1,13 @@
 from datetime import datetime
 from enum import Enum
+from sqlalchemy import update
+from sqlalchemy.orm.attributes import set_committed_value
 from . import db
+from .product import Product
+from .cost_layer import CostLayer
+
+# Nombre de tentatives d'un ajustement absolu en cas d'écriture concurrente
+ADJUSTMENT_ATTEMPTS = 5
 
 class MovementType(Enum):
     IN = "in"           # Entrée de stock
@@ -25,6 +32,11 @@ class StockMovement(db.Model):
     created_by = db.Column(db.String(100))  # Utilisateur qui a effectué le mouvement
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_stock_movements_product_created', 'product_id', 'created_at'),
+        db.Index('ix_stock_movements_created_at', 'created_at'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -46,20 +58,26 @@ class StockMovement(db.Model):
     
     @staticmethod
     def create_movement(product, movement_type, quantity, reason=None, reference_type=None, reference_id=None, unit_cost=None, created_by=None, notes=None):
-        """Crée un mouvement de stock et met à jour le stock du produit"""
-        previous_stock = product.stock_quantity
-        
-        if movement_type == MovementType.IN:
-            new_stock = previous_stock + quantity
-        elif movement_type == MovementType.OUT:
-            new_stock = previous_stock - quantity
-            if new_stock < 0:
-                raise ValueError("Stock insuffisant pour effectuer cette sortie")
-        elif movement_type == MovementType.ADJUSTMENT:
+        """Crée un mouvement de stock et met à jour le stock du produit
+        (UPDATE conditionnel atomique : une sortie ne peut pas rendre le stock négatif)"""
+        if movement_type == MovementType.ADJUSTMENT:
             new_stock = quantity  # Pour les ajustements, quantity représente le nouveau stock
+            previous_stock = _set_stock(product, new_stock)
             quantity = new_stock - previous_stock  # Calcul de la différence
-        else:  # RETURN
-            new_stock = previous_stock + quantity
+        else:
+            delta = -quantity if movement_type == MovementType.OUT else quantity
+            new_stock = _apply_stock_delta(product, delta)
+            if new_stock is None:
+                raise ValueError("Stock insuffisant pour effectuer cette sortie")
+            previous_stock = new_stock - delta
+        
+        # Couches de coût FIFO et coût moyen pondéré
+        CostLayer.record([{
+            'product_id': product.id,
+            'previous_stock': previous_stock,
+            'new_stock': new_stock,
+            'unit_cost': unit_cost
+        }])
         
         # Créer le mouvement
         movement = StockMovement(
@@ -76,12 +94,64 @@ class StockMovement(db.Model):
             created_by=created_by
         )
         
-        # Mettre à jour le stock du produit
-        product.stock_quantity = new_stock
-        product.updated_at = datetime.utcnow()
-        
         return movement
     
+    @staticmethod
+    def apply_stock_delta(product, delta):
+        """Applique un écart de stock agrégé de façon atomique ; None si le stock est insuffisant"""
+        return _apply_stock_delta(product, delta)
+    
+    @staticmethod
+    def build_row(product_id, movement_type, previous_stock, new_stock, **fields):
+        """Prépare un mouvement pour une insertion en masse (quantité = écart absolu de stock)"""
+        row = {
+            'product_id': product_id,
+            'movement_type': movement_type,
+            'quantity': abs(new_stock - previous_stock),
+            'previous_stock': previous_stock,
+            'new_stock': new_stock,
+            'created_at': datetime.utcnow()
+        }
+        row.update(fields)
+        return row
+    
     def __repr__(self):
         return f'<StockMovement {self.movement_type.value} {self.quantity} for {self.product.name if self.product else "Unknown"}>'
 
+def _stock_update(product, new_quantity):
+    """UPDATE du stock d'un produit, avec l'indicateur de stock bas et la date de mise à jour"""
+    return update(Product).where(Product.id == product.id).values(
+        stock_quantity=new_quantity,
+        is_low_stock=new_quantity <= Product.min_stock_level,
+        updated_at=datetime.utcnow()
+    ).returning(Product.stock_quantity, Product.is_low_stock, Product.updated_at)
+
+def _sync_product(product, row):
+    """Reporte le résultat de l'UPDATE sur l'objet sans le marquer comme modifié"""
+    set_committed_value(product, 'stock_quantity', row.stock_quantity)
+    set_committed_value(product, 'is_low_stock', row.is_low_stock)
+    set_committed_value(product, 'updated_at', row.updated_at)
+
+def _apply_stock_delta(product, delta):
+    """Applique stock_quantity + delta de façon atomique ; None si le stock est insuffisant"""
+    statement = _stock_update(product, Product.stock_quantity + delta)
+    if delta < 0:
+        statement = statement.where(Product.stock_quantity >= -delta)
+    row = db.session.execute(statement, execution_options={'synchronize_session': False}).first()
+    if row is None:
+        return None
+    _sync_product(product, row)
+    return row.stock_quantity
+
+def _set_stock(product, new_stock):
+    """Fixe le stock (ajustement) par verrouillage optimiste ; retourne l'ancien stock"""
+    for _ in range(ADJUSTMENT_ATTEMPTS):
+        previous_stock = product.stock_quantity
+        statement = _stock_update(product, new_stock).where(Product.stock_quantity == previous_stock)
+        row = db.session.execute(statement, execution_options={'synchronize_session': False}).first()
+        if row is not None:
+            _sync_product(product, row)
+            return previous_stock
+        # Stock modifié entre-temps : relire la valeur courante et réessayer
+        db.session.refresh(product, ['stock_quantity'])
+    raise ValueError("Le stock a été modifié simultanément, veuillez réessayer")
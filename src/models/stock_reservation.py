@@ -0,0 +1,39 @@
+from datetime import datetime
+from enum import Enum
+from . import db
+
+class ReservationStatus(Enum):
+    ACTIVE = "active"        # Quantité réservée pour une vente en cours
+    RELEASED = "released"    # Réservation libérée (annulation)
+    CONVERTED = "converted"  # Réservation transformée en sortie de stock (livraison)
+
+class StockReservation(db.Model):
+    __tablename__ = 'stock_reservations'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, index=True)
+    order_item_id = db.Column(db.Integer, db.ForeignKey('order_items.id'), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.Enum(ReservationStatus), default=ReservationStatus.ACTIVE, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_stock_reservations_product_status', 'product_id', 'status'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'order_id': self.order_id,
+            'order_item_id': self.order_item_id,
+            'product_id': self.product_id,
+            'quantity': self.quantity,
+            'status': self.status.value,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+    
+    def __repr__(self):
+        return f'<StockReservation {self.product_id} x{self.quantity} {self.status.value}>'
@@ -0,0 +1,13 @@
+from . import db
+
+class StockSnapshot(db.Model):
+    """Point de contrôle du stock d'un produit à un instant donné ; toutes les
+    lignes d'un même instantané partagent la même date taken_at"""
+    __tablename__ = 'stock_snapshots'
+    
+    taken_at = db.Column(db.DateTime, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), primary_key=True)
+    stock_quantity = db.Column(db.Integer, nullable=False)
+    
+    def __repr__(self):
+        return f'<StockSnapshot {self.taken_at} {self.product_id}: {self.stock_quantity}>'
@@ -22,7 +22,9 @@ class Supplier(db.Model):
     # Relations
     orders = db.relationship('Order', backref='supplier')
     
-    def to_dict(self):
+    def to_dict(self, products_count=None):
+        if products_count is None:
+            products_count = len(self.products) if hasattr(self, 'products') else 0
         return {
             'id': self.id,
             'name': self.name,
@@ -38,7 +40,7 @@ class Supplier(db.Model):
             'is_active': self.is_active,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'products_count': len(self.products) if hasattr(self, 'products') else 0
+            'products_count': products_count
         }
     
     def __repr__(self):
@@ -0,0 +1,37 @@
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from src.services.csv_export import EXPORT_ENTITIES, csv_chunks, gzip_chunks
+from src.routes.reports import parse_date
+
+export_bp = Blueprint('export', __name__)
+
+def wants_gzip():
+    """Compression gzip si le client l'accepte, sauf gzip=0"""
+    if request.args.get('gzip', '').lower() in ('0', 'false'):
+        return False
+    return request.args.get('gzip', '').lower() in ('1', 'true') or 'gzip' in request.accept_encodings
+
+@export_bp.route('/export/<entity>.csv', methods=['GET'])
+def export_csv(entity):
+    """Export CSV en flux d'une entité (filtres start_date / end_date)"""
+    try:
+        if entity not in EXPORT_ENTITIES:
+            return jsonify({
+                'success': False,
+                'error': f"Export inconnu : {entity} (valeurs possibles : {', '.join(EXPORT_ENTITIES)})"
+            }), 404
+        
+        start_date = parse_date(request.args.get('start_date'))
+        end_date = parse_date(request.args.get('end_date'))
+        
+        chunks = csv_chunks(entity, start_date, end_date)
+        headers = {'Content-Disposition': f'attachment; filename={entity}.csv', 'Vary': 'Accept-Encoding'}
+        if wants_gzip():
+            chunks = gzip_chunks(chunks)
+            headers['Content-Encoding'] = 'gzip'
+        
+        return Response(stream_with_context(chunks), mimetype='text/csv', headers=headers)
+    
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
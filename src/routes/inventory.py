@@ -0,0 +1,144 @@
+from flask import Blueprint, request, jsonify
+from src.models import db, InventoryCount, InventoryCountLine, InventoryCountStatus
+from src.services.inventory_count import record_lines, compute_variances, summarize_variances, commit_count
+
+inventory_bp = Blueprint('inventory', __name__)
+
+def lines_count(count_id):
+    return InventoryCountLine.query.filter_by(count_id=count_id).count()
+
+@inventory_bp.route('/inventory-counts', methods=['GET'])
+def get_inventory_counts():
+    """Récupère les sessions d'inventaire"""
+    try:
+        query = InventoryCount.query
+        
+        status = request.args.get('status')
+        if status:
+            try:
+                query = query.filter(InventoryCount.status == InventoryCountStatus(status))
+            except ValueError:
+                return jsonify({'success': False, 'error': 'Statut invalide'}), 400
+        
+        counts = query.order_by(InventoryCount.created_at.desc()).all()
+        
+        return jsonify({
+            'success': True,
+            'inventory_counts': [count.to_dict() for count in counts],
+            'count': len(counts)
+        })
+    
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@inventory_bp.route('/inventory-counts', methods=['POST'])
+def open_inventory_count():
+    """Ouvre une session d'inventaire"""
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        count = InventoryCount(
+            notes=data.get('notes', ''),
+            created_by=data.get('created_by', 'User')
+        )
+        db.session.add(count)
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'inventory_count': count.to_dict(lines_count=0),
+            'message': 'Session d\'inventaire ouverte'
+        }), 201
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@inventory_bp.route('/inventory-counts/<int:count_id>', methods=['GET'])
+def get_inventory_count(count_id):
+    """Récupère une session d'inventaire avec l'aperçu des écarts"""
+    try:
+        count = InventoryCount.query.get_or_404(count_id)
+        rows = compute_variances(count.id)
+        
+        response = {
+            'success': True,
+            'inventory_count': count.to_dict(lines_count=len(rows))
+        }
+        if count.status == InventoryCountStatus.OPEN:
+            response['summary'] = summarize_variances(rows)
+        return jsonify(response)
+    
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@inventory_bp.route('/inventory-counts/<int:count_id>/lines', methods=['POST'])
+def submit_inventory_lines(count_id):
+    """Enregistre un lot de quantités comptées"""
+    try:
+        count = InventoryCount.query.get_or_404(count_id)
+        if count.status != InventoryCountStatus.OPEN:
+            return jsonify({'success': False, 'error': 'Cette session d\'inventaire est clôturée'}), 400
+        
+        data = request.get_json(silent=True) or {}
+        lines = data.get('lines')
+        if not isinstance(lines, list) or not lines:
+            return jsonify({'success': False, 'error': 'Au moins une ligne est requise'}), 400
+        
+        accepted, errors = record_lines(count, lines)
+        db.session.commit()
+        
+        return jsonify({
+            'success': not errors,
+            'accepted': accepted,
+            'errors': errors,
+            'inventory_count': count.to_dict(lines_count=lines_count(count.id))
+        })
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@inventory_bp.route('/inventory-counts/<int:count_id>/commit', methods=['POST'])
+def commit_inventory_count(count_id):
+    """Valide une session : ajuste les stocks et enregistre les mouvements en une transaction"""
+    try:
+        count = InventoryCount.query.get_or_404(count_id)
+        if count.status != InventoryCountStatus.OPEN:
+            return jsonify({'success': False, 'error': 'Cette session d\'inventaire est clôturée'}), 400
+        
+        data = request.get_json(silent=True) or {}
+        summary = commit_count(count, created_by=data.get('created_by'))
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'inventory_count': count.to_dict(lines_count=summary['lines_counted']),
+            'summary': summary,
+            'message': f'Inventaire validé : {summary["products_adjusted"]} produit(s) ajusté(s)'
+        })
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@inventory_bp.route('/inventory-counts/<int:count_id>/cancel', methods=['POST'])
+def cancel_inventory_count(count_id):
+    """Annule une session d'inventaire sans toucher aux stocks"""
+    try:
+        count = InventoryCount.query.get_or_404(count_id)
+        if count.status != InventoryCountStatus.OPEN:
+            return jsonify({'success': False, 'error': 'Cette session d\'inventaire est clôturée'}), 400
+        
+        count.status = InventoryCountStatus.CANCELLED
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'inventory_count': count.to_dict(lines_count=lines_count(count.id)),
+            'message': 'Session d\'inventaire annulée'
+        })
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
@@ -1,15 +1,21 @@
 from flask import Blueprint, request, jsonify
-from src.models import db, Order, OrderItem, OrderStatus, OrderType, Product, Supplier, StockMovement, MovementType
+from src.models import db, Order, OrderItem, OrderStatus, OrderType, OrderSequence, Product, Supplier, StockMovement, MovementType
+from src.models.serializers import serialize_orders
+from src.services.order_workflow import bulk_update_status, update_reservations, MAX_BULK_ORDERS
+from src.services.reservations import reserve_items, discard_order, discard_item
+from src.services.rollups import update_rollups
+from src.services.purchase_proposals import propose_purchase_orders, parse_target_multiplier
+from src.services.idempotency import idempotent
+from src.services.streaming import wants_stream, stream_ndjson
 from datetime import datetime
+from collections import defaultdict
 import uuid
 
 orders_bp = Blueprint('orders', __name__)
 
 def generate_order_number(order_type):
-    """Génère un numéro de commande unique"""
-    prefix = "ACH" if order_type == OrderType.PURCHASE else "VTE"
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    return f"{prefix}-{timestamp}"
+    """Génère un numéro de commande unique (ACH/VTE-AAAAMMJJ-NNNNN)"""
+    return OrderSequence.next_numbers(order_type)[0]
 
 @orders_bp.route('/orders', methods=['GET'])
 def get_orders():
@@ -50,11 +56,17 @@ def get_orders():
                 )
             )
         
-        orders = query.order_by(Order.order_date.desc()).all()
+        query = query.order_by(Order.order_date.desc())
+        
+        # Mode flux : une commande par ligne NDJSON
+        if wants_stream():
+            return stream_ndjson(query, serialize_orders)
+        
+        orders = query.all()
         
         return jsonify({
             'success': True,
-            'orders': [order.to_dict() for order in orders],
+            'orders': serialize_orders(orders),
             'count': len(orders)
         })
     
@@ -75,6 +87,7 @@ def get_order(order_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @orders_bp.route('/orders', methods=['POST'])
+@idempotent
 def create_order():
     """Crée une nouvelle commande"""
     try:
@@ -99,6 +112,41 @@ def create_order():
             if not supplier:
                 return jsonify({'success': False, 'error': 'Fournisseur introuvable'}), 400
         
+        # Articles de commande : tous les produits chargés en une requête
+        items_data = data.get('items', [])
+        if not items_data:
+            return jsonify({'success': False, 'error': 'Au moins un article est requis'}), 400
+        
+        try:
+            product_ids = [int(item_data.get('product_id')) for item_data in items_data]
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'Identifiant de produit invalide'}), 400
+        products = {product.id: product for product in Product.query.filter(Product.id.in_(set(product_ids))).all()}
+        
+        quantities = []
+        requested = defaultdict(int)
+        for product_id, item_data in zip(product_ids, items_data):
+            if product_id not in products:
+                return jsonify({'success': False, 'error': f'Produit {product_id} introuvable'}), 400
+            try:
+                quantity = int(item_data.get('quantity'))
+            except (TypeError, ValueError):
+                quantity = 0
+            if quantity <= 0:
+                return jsonify({'success': False, 'error': f'Quantité invalide pour le produit {product_id}'}), 400
+            quantities.append(quantity)
+            requested[product_id] += quantity
+        
+        # Vérifier le disponible (stock - réservé) pour les ventes, quantités cumulées par produit
+        if order_type_enum == OrderType.SALE:
+            for product_id, quantity in requested.items():
+                product = products[product_id]
+                if product.available_quantity < quantity:
+                    return jsonify({
+                        'success': False, 
+                        'error': f'Stock insuffisant pour {product.name} (disponible: {product.available_quantity})'
+                    }), 400
+        
         # Créer la commande
         order = Order(
             order_number=generate_order_number(order_type_enum),
@@ -111,46 +159,35 @@ def create_order():
             notes=data.get('notes', '')
         )
         
-        db.session.add(order)
-        db.session.flush()  # Pour obtenir l'ID de la commande
-        
-        # Ajouter les articles de commande
-        items_data = data.get('items', [])
-        if not items_data:
-            return jsonify({'success': False, 'error': 'Au moins un article est requis'}), 400
-        
-        for item_data in items_data:
-            product = Product.query.get(item_data.get('product_id'))
-            if not product:
-                return jsonify({'success': False, 'error': f'Produit {item_data.get("product_id")} introuvable'}), 400
-            
-            # Vérifier le stock pour les ventes
-            if order_type_enum == OrderType.SALE:
-                if product.stock_quantity < item_data.get('quantity', 0):
-                    return jsonify({
-                        'success': False, 
-                        'error': f'Stock insuffisant pour {product.name} (disponible: {product.stock_quantity})'
-                    }), 400
-            
+        for product_id, quantity, item_data in zip(product_ids, quantities, items_data):
             order_item = OrderItem(
-                order_id=order.id,
-                product_id=item_data['product_id'],
-                quantity=item_data['quantity'],
-                unit_price=item_data.get('unit_price', product.unit_price)
+                product_id=product_id,
+                quantity=quantity,
+                unit_price=item_data.get('unit_price', products[product_id].unit_price)
             )
             order_item.calculate_total_price()
-            db.session.add(order_item)
+            order.order_items.append(order_item)
         
         # Calculer le total de la commande
         order.calculate_total()
+        db.session.add(order)
+        db.session.flush()  # Pour obtenir les ID des articles
+        
+        # Réserver le stock des ventes jusqu'à la livraison
+        if order_type_enum == OrderType.SALE:
+            reserve_items(order, order.order_items)
+        
         db.session.commit()
         
         return jsonify({
             'success': True,
-            'order': order.to_dict(),
+            'order': serialize_orders([order])[0],
             'message': 'Commande créée avec succès'
         }), 201
     
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -195,6 +232,81 @@ def update_order(order_id):
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@orders_bp.route('/orders/status', methods=['PUT'])
+def bulk_update_order_status():
+    """Met à jour le statut d'un lot de commandes en une transaction"""
+    try:
+        data = request.get_json()
+        
+        order_ids = data.get('order_ids')
+        if not isinstance(order_ids, list) or not order_ids:
+            return jsonify({'success': False, 'error': 'La liste order_ids est requise'}), 400
+        if len(order_ids) > MAX_BULK_ORDERS:
+            return jsonify({'success': False, 'error': f'Au plus {MAX_BULK_ORDERS} commandes par lot'}), 400
+        try:
+            order_ids = [int(order_id) for order_id in order_ids]
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'Identifiant de commande invalide'}), 400
+        
+        new_status = data.get('status')
+        if not new_status:
+            return jsonify({'success': False, 'error': 'Le statut est requis'}), 400
+        
+        try:
+            new_status_enum = OrderStatus(new_status)
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Statut invalide'}), 400
+        
+        results = bulk_update_status(order_ids, new_status_enum)
+        db.session.commit()
+        
+        updated = sum(1 for result in results if result['success'])
+        return jsonify({
+            'success': updated == len(results),
+            'results': results,
+            'updated': updated,
+            'message': f'{updated} commande(s) passée(s) au statut {new_status_enum.value}'
+        })
+    
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@orders_bp.route('/orders/purchase-proposals', methods=['POST'])
+@idempotent
+def create_purchase_proposals():
+    """Propose une commande d'achat en attente par fournisseur pour les
+    produits en stock bas ; simulation par défaut, création avec "dry_run": false"""
+    try:
+        data = request.get_json(silent=True) or {}
+        target_multiplier = parse_target_multiplier(data.get('target_multiplier'))
+        dry_run = data.get('dry_run', True) is not False
+        
+        supplier_id = data.get('supplier_id')
+        if supplier_id is not None:
+            try:
+                supplier_id = int(supplier_id)
+            except (TypeError, ValueError):
+                return jsonify({'success': False, 'error': 'Identifiant de fournisseur invalide'}), 400
+        
+        report = propose_purchase_orders(target_multiplier, supplier_id, dry_run=dry_run)
+        
+        return jsonify({
+            'success': True,
+            **report,
+            'message': f"{report['orders_count']} commande(s) d'achat {'proposée(s)' if dry_run else 'créée(s)'}"
+        }), 200 if dry_run else 201
+    
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @orders_bp.route('/orders/<int:order_id>/status', methods=['PUT'])
 def update_order_status(order_id):
     """Met à jour le statut d'une commande"""
@@ -212,6 +324,7 @@ def update_order_status(order_id):
             return jsonify({'success': False, 'error': 'Statut invalide'}), 400
         
         old_status = order.status
+        update_reservations(order, old_status, new_status_enum)
         order.status = new_status_enum
         
         # Actions spéciales selon le nouveau statut
@@ -247,6 +360,9 @@ def update_order_status(order_id):
                     )
                     db.session.add(movement)
         
+        # Agrégats journaliers des ventes et achats livrés
+        update_rollups([order], old_status, new_status_enum)
+        
         order.updated_at = datetime.utcnow()
         db.session.commit()
         
@@ -276,6 +392,7 @@ def delete_order(order_id):
                 'error': 'Impossible de supprimer une commande livrée'
             }), 400
         
+        discard_order(order.id)
         db.session.delete(order)
         db.session.commit()
         
@@ -306,9 +423,9 @@ def add_order_item(order_id):
         if not product:
             return jsonify({'success': False, 'error': 'Produit introuvable'}), 400
         
-        # Vérifier le stock pour les ventes
+        # Vérifier le disponible pour les ventes
         if order.order_type == OrderType.SALE:
-            if product.stock_quantity < data.get('quantity', 0):
+            if product.available_quantity < data.get('quantity', 0):
                 return jsonify({
                     'success': False, 
                     'error': f'Stock insuffisant pour {product.name}'
@@ -323,6 +440,9 @@ def add_order_item(order_id):
         order_item.calculate_total_price()
         
         db.session.add(order_item)
+        db.session.flush()  # Pour obtenir l'ID de l'article
+        if order.order_type == OrderType.SALE:
+            reserve_items(order, [order_item])
         order.calculate_total()
         order.updated_at = datetime.utcnow()
         db.session.commit()
@@ -333,6 +453,9 @@ def add_order_item(order_id):
             'message': 'Article ajouté avec succès'
         })
     
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -355,6 +478,7 @@ def remove_order_item(order_id, item_id):
                 'error': 'Impossible de modifier une commande livrée ou annulée'
             }), 400
         
+        discard_item(item.id)
         db.session.delete(item)
         order.calculate_total()
         order.updated_at = datetime.utcnow()
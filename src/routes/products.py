@@ -1,9 +1,42 @@
 from flask import Blueprint, request, jsonify
-from src.models import db, Product, Supplier, StockMovement, MovementType
+from sqlalchemy.orm import load_only
+from src.models import db, Product, OrderItem, StockMovement, MovementType, Supplier
+from src.models.serializers import serialize_products, serialize_movements
+from src.services.pagination import parse_limit, keyset_paginate, DEFAULT_PAGE_SIZE
+from src.services.search import search_index_available, build_match_query, matching_products
+from src.services.product_import import import_products, read_csv_rows, read_ndjson_rows, IMPORT_MODES
+from src.services.idempotency import idempotent
+from src.services.forecasting import parse_parameters, suggest_reorder_points
 from datetime import datetime
 
 products_bp = Blueprint('products', __name__)
 
+# Colonnes autorisées pour le tri (toutes indexées)
+SORTABLE_COLUMNS = {
+    'id': Product.id,
+    'name': Product.name,
+    'reference': Product.reference,
+    'stock_quantity': Product.stock_quantity,
+    'updated_at': Product.updated_at
+}
+
+def parse_fields(value):
+    """Valide le paramètre fields (liste séparée par des virgules, id toujours inclus)"""
+    if not value:
+        return None
+    fields = ['id'] + [field.strip() for field in value.split(',') if field.strip() and field.strip() != 'id']
+    unknown = [field for field in fields if field not in Product.SERIALIZABLE_FIELDS]
+    if unknown:
+        raise ValueError(f'Champ(s) inconnu(s) : {", ".join(unknown)}')
+    return fields
+
+def projection_options(fields, sort_column):
+    """Option de chargement limitant les colonnes lues aux champs demandés"""
+    columns = {'id', sort_column.key}
+    for field in fields:
+        columns.update(Product.SERIALIZABLE_FIELDS[field])
+    return load_only(*(getattr(Product, column) for column in sorted(columns)))
+
 @products_bp.route('/products', methods=['GET'])
 def get_products():
     """Récupère tous les produits avec filtres optionnels"""
@@ -13,6 +46,7 @@ def get_products():
         supplier_id = request.args.get('supplier_id')
         low_stock = request.args.get('low_stock', 'false').lower() == 'true'
         search = request.args.get('search', '').strip()
+        abc_class = request.args.get('abc_class')
         
         # Construction de la requête
         query = Product.query
@@ -23,27 +57,78 @@ def get_products():
         if supplier_id:
             query = query.filter(Product.supplier_id == supplier_id)
         
+        # Recherche plein texte (FTS5), ilike si l'index n'est pas disponible
+        matches = None
         if search:
-            query = query.filter(
-                db.or_(
-                    Product.name.ilike(f'%{search}%'),
-                    Product.reference.ilike(f'%{search}%'),
-                    Product.description.ilike(f'%{search}%')
+            if search_index_available() and build_match_query(search):
+                matches = matching_products(search)
+                query = query.join(matches, matches.c.product_id == Product.id)
+            else:
+                query = query.filter(
+                    db.or_(
+                        Product.name.ilike(f'%{search}%'),
+                        Product.reference.ilike(f'%{search}%'),
+                        Product.description.ilike(f'%{search}%')
+                    )
                 )
-            )
-        
-        products = query.all()
         
-        # Filtrer les produits en stock bas si demandé
         if low_stock:
-            products = [p for p in products if p.stock_quantity <= p.min_stock_level]
+            query = query.filter(Product.is_low_stock == True)
         
-        return jsonify({
+        # Classe ABC enregistrée (une ou plusieurs, ex. abc_class=A,B)
+        if abc_class:
+            query = query.filter(Product.abc_class.in_([value.strip().upper() for value in abc_class.split(',')]))
+        
+        # Tri (par pertinence par défaut lors d'une recherche), projection et pagination par curseur
+        sort = request.args.get('sort', 'relevance' if matches is not None else 'id')
+        descending = sort.startswith('-')
+        ranked = False
+        if sort.lstrip('-') == 'relevance':
+            descending = False
+            sort_column = Product.id
+            if matches is not None:
+                ranked = True
+                query = query.add_columns(matches.c.rank)
+                keyset = [matches.c.rank, Product.id]
+            else:
+                keyset = [Product.id]
+        else:
+            sort_column = SORTABLE_COLUMNS.get(sort.lstrip('-'))
+            if sort_column is None:
+                return jsonify({'success': False, 'error': f'Tri invalide : {sort}'}), 400
+            keyset = [sort_column] if sort_column is Product.id else [sort_column, Product.id]
+        
+        fields = parse_fields(request.args.get('fields'))
+        if fields:
+            query = query.options(projection_options(fields, sort_column))
+        
+        cursor = request.args.get('cursor')
+        limit = parse_limit(request.args.get('limit'), default=DEFAULT_PAGE_SIZE if cursor else None)
+        
+        if limit is None:
+            # Sans limit ni cursor : liste complète (compatibilité)
+            ordering = [column.desc() if descending else column.asc() for column in keyset]
+            products = query.order_by(*ordering).all()
+            next_cursor = None
+        else:
+            products, next_cursor = keyset_paginate(query, keyset, descending, cursor, limit)
+        
+        if ranked:
+            # Lignes (produit, rang) du tri par pertinence
+            products = [row[0] for row in products]
+        
+        response = {
             'success': True,
-            'products': [product.to_dict() for product in products],
+            'products': serialize_products(products, fields),
             'count': len(products)
-        })
+        }
+        if limit is not None:
+            response['next_cursor'] = next_cursor
+            response['has_more'] = next_cursor is not None
+        return jsonify(response)
     
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -90,25 +175,27 @@ def create_product():
             category=data['category'],
             reference=data['reference'],
             unit_price=float(data['unit_price']),
-            stock_quantity=int(data.get('stock_quantity', 0)),
+            stock_quantity=0,
             min_stock_level=int(data.get('min_stock_level', 10)),
             supplier_id=data.get('supplier_id')
         )
         
         db.session.add(product)
-        db.session.commit()
+        db.session.flush()  # Pour obtenir l'ID du produit
         
-        # Créer un mouvement de stock initial si nécessaire
-        if product.stock_quantity > 0:
+        # Le stock initial est porté par son mouvement d'entrée
+        initial_stock = int(data.get('stock_quantity', 0))
+        if initial_stock > 0:
             movement = StockMovement.create_movement(
                 product=product,
                 movement_type=MovementType.IN,
-                quantity=product.stock_quantity,
+                quantity=initial_stock,
                 reason="Stock initial",
                 created_by="System"
             )
             db.session.add(movement)
-            db.session.commit()
+        
+        db.session.commit()
         
         return jsonify({
             'success': True,
@@ -120,6 +207,69 @@ def create_product():
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@products_bp.route('/products/import', methods=['POST'])
+def import_products_route():
+    """Importe des produits en masse depuis un flux CSV ou NDJSON"""
+    try:
+        mode = request.args.get('mode', 'insert')
+        if mode not in IMPORT_MODES:
+            return jsonify({'success': False, 'error': 'Mode d\'import invalide (insert ou upsert)'}), 400
+        
+        # Format : paramètre explicite ou type de contenu
+        import_format = request.args.get('format')
+        if not import_format:
+            content_type = request.mimetype or ''
+            if content_type == 'text/csv':
+                import_format = 'csv'
+            elif content_type in ('application/x-ndjson', 'application/jsonl'):
+                import_format = 'ndjson'
+        
+        if import_format == 'csv':
+            rows = read_csv_rows(request.stream, delimiter=request.args.get('delimiter', ','))
+        elif import_format == 'ndjson':
+            rows = read_ndjson_rows(request.stream)
+        else:
+            return jsonify({'success': False, 'error': 'Format d\'import invalide (text/csv ou application/x-ndjson)'}), 400
+        
+        report = import_products(rows, mode=mode)
+        
+        return jsonify({
+            'success': not report['errors'],
+            'processed': report['processed'],
+            'created': report['created'],
+            'updated': report['updated'],
+            'errors': report['errors'],
+            'error_count': len(report['errors']),
+            'message': f'Import terminé : {report["created"]} créé(s), {report["updated"]} mis à jour'
+        })
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@products_bp.route('/products/reorder-points', methods=['POST'])
+def reorder_points():
+    """Calcule les seuils de réapprovisionnement à partir de l'historique des
+    sorties ; simulation par défaut, écriture avec "dry_run": false"""
+    try:
+        data = request.get_json(silent=True) or {}
+        lookback_days, lead_time_days, service_level = parse_parameters(data)
+        apply = data.get('dry_run', True) is False
+        
+        report = suggest_reorder_points(lookback_days, lead_time_days, service_level, apply=apply)
+        
+        return jsonify({
+            'success': True,
+            **report,
+            'message': f"{len(report['changes'])} seuil(s) {'mis à jour' if apply else 'à modifier'}"
+        })
+    
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @products_bp.route('/products/<int:product_id>', methods=['PUT'])
 def update_product(product_id):
     """Met à jour un produit"""
@@ -165,7 +315,10 @@ def delete_product(product_id):
         product = Product.query.get_or_404(product_id)
         
         # Vérifier s'il y a des commandes liées
-        if product.order_items:
+        has_order_items = db.session.query(
+            OrderItem.query.filter_by(product_id=product_id).exists()
+        ).scalar()
+        if has_order_items:
             return jsonify({
                 'success': False, 
                 'error': 'Impossible de supprimer ce produit car il est lié à des commandes'
@@ -184,6 +337,7 @@ def delete_product(product_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @products_bp.route('/products/<int:product_id>/stock', methods=['POST'])
+@idempotent
 def adjust_stock(product_id):
     """Ajuste le stock d'un produit"""
     try:
@@ -194,6 +348,7 @@ def adjust_stock(product_id):
         quantity = data.get('quantity')
         reason = data.get('reason', '')
         created_by = data.get('created_by', 'User')
+        unit_cost = data.get('unit_cost')  # Coût d'achat unitaire d'une entrée (valorisation)
         
         if not movement_type or quantity is None:
             return jsonify({'success': False, 'error': 'Type de mouvement et quantité requis'}), 400
@@ -210,6 +365,7 @@ def adjust_stock(product_id):
             movement_type=movement_type_enum,
             quantity=int(quantity),
             reason=reason,
+            unit_cost=float(unit_cost) if unit_cost is not None else None,
             created_by=created_by
         )
         
@@ -240,7 +396,7 @@ def get_product_movements(product_id):
         return jsonify({
             'success': True,
             'product_name': product.name,
-            'movements': [movement.to_dict() for movement in movements],
+            'movements': serialize_movements(movements),
             'count': len(movements)
         })
     
@@ -1,125 +1,340 @@
 from flask import Blueprint, request, jsonify
-from src.models import db, Product, Order, OrderItem, OrderType, OrderStatus, StockMovement, Supplier
-from datetime import datetime, timedelta
-from sqlalchemy import func, and_
+from src.models import db, Product, CostLayer, Order, OrderType, OrderStatus, StockMovement, MovementType, Supplier
+from datetime import datetime, time, timedelta
+from sqlalchemy import func, and_, case, select, true
+from src.models.serializers import serialize_products, serialize_orders, serialize_movements
+from src.services.pagination import parse_limit, keyset_paginate, DEFAULT_PAGE_SIZE
+from src.services.streaming import wants_stream, stream_ndjson
+from src.services.cache import cached_report, cache_stats
+from src.services.precompute import register_report, precomputed, parse_max_age
+from src.services.stock_history import stock_as_of, take_snapshot
+from src.services.valuation import stock_valuation
+from src.services.abc_analysis import METRICS, parse_cutoffs, classify_products
+from src.services.timeseries import BUCKETS, BREAKDOWNS, default_start, order_timeseries
+from src.services.rollups import order_summary, top_products as rollup_top_products, top_suppliers as rollup_top_suppliers
 
 reports_bp = Blueprint('reports', __name__)
 
-@reports_bp.route('/reports/dashboard', methods=['GET'])
-def get_dashboard_stats():
-    """Récupère les statistiques pour le tableau de bord"""
+def parse_date(value):
+    """Date ISO d'un paramètre de filtrage (None si absent)"""
+    if not value:
+        return None
     try:
-        # Statistiques générales
-        total_products = Product.query.count()
-        total_suppliers = Supplier.query.filter_by(is_active=True).count()
-        
-        # Produits en stock bas
-        low_stock_products = Product.query.filter(
-            Product.stock_quantity <= Product.min_stock_level
-        ).count()
-        
-        # Commandes en cours
-        pending_orders = Order.query.filter(
-            Order.status.in_([OrderStatus.PENDING, OrderStatus.CONFIRMED, OrderStatus.SHIPPED])
-        ).count()
-        
-        # Valeur totale du stock
-        total_stock_value = db.session.query(
-            func.sum(Product.stock_quantity * Product.unit_price)
-        ).scalar() or 0
-        
-        # Commandes du mois en cours
-        start_of_month = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        monthly_orders = Order.query.filter(
-            Order.order_date >= start_of_month
-        ).count()
-        
-        # Ventes du mois
-        monthly_sales = db.session.query(
-            func.sum(Order.total_amount)
-        ).filter(
-            and_(
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'Date invalide : {value}')
+
+# Durée de vie du cache des statistiques du tableau de bord (secondes)
+DASHBOARD_TTL = 15
+
+def dashboard_stats():
+    """Statistiques du tableau de bord en une seule requête : une ligne
+    d'agrégats conditionnels par table, jointes entre elles"""
+    start_of_month = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    
+    products = select(
+        func.count(Product.id).label('total_products'),
+        func.coalesce(func.sum(case((Product.is_low_stock == True, 1), else_=0)), 0).label('low_stock_products'),
+        func.coalesce(func.sum(Product.stock_quantity * Product.unit_price), 0).label('total_retail_value')
+    ).subquery()
+    # Valeur du stock au coût FIFO (couches restantes), comme le rapport de valorisation
+    layers = select(
+        func.coalesce(func.sum(CostLayer.remaining_quantity * CostLayer.unit_cost), 0).label('total_stock_value')
+    ).subquery()
+    suppliers = select(
+        func.count(Supplier.id).label('total_suppliers')
+    ).where(Supplier.is_active == True).subquery()
+    orders = select(
+        func.coalesce(func.sum(case(
+            (Order.status.in_([OrderStatus.PENDING, OrderStatus.CONFIRMED, OrderStatus.SHIPPED]), 1), else_=0
+        )), 0).label('pending_orders'),
+        func.coalesce(func.sum(case((Order.order_date >= start_of_month, 1), else_=0)), 0).label('monthly_orders'),
+        func.coalesce(func.sum(case(
+            (and_(
                 Order.order_type == OrderType.SALE,
                 Order.order_date >= start_of_month,
                 Order.status == OrderStatus.DELIVERED
-            )
-        ).scalar() or 0
-        
+            ), Order.total_amount), else_=0
+        )), 0).label('monthly_sales')
+    ).subquery()
+    
+    row = db.session.execute(
+        select(products, layers, suppliers, orders).select_from(
+            products.join(layers, true()).join(suppliers, true()).join(orders, true())
+        )
+    ).one()
+    
+    return {
+        'total_products': row.total_products,
+        'total_suppliers': row.total_suppliers,
+        'low_stock_products': int(row.low_stock_products),
+        'pending_orders': int(row.pending_orders),
+        'total_stock_value': round(row.total_stock_value, 2),
+        'total_retail_value': round(row.total_retail_value, 2),
+        'monthly_orders': int(row.monthly_orders),
+        'monthly_sales': round(row.monthly_sales, 2)
+    }
+
+@reports_bp.route('/reports/dashboard', methods=['GET'])
+@cached_report(DASHBOARD_TTL)
+def get_dashboard_stats():
+    """Récupère les statistiques pour le tableau de bord (mises en cache,
+    invalidées à chaque écriture sur les produits, fournisseurs, commandes ou mouvements)"""
+    try:
         return jsonify({
             'success': True,
-            'stats': {
-                'total_products': total_products,
-                'total_suppliers': total_suppliers,
-                'low_stock_products': low_stock_products,
-                'pending_orders': pending_orders,
-                'total_stock_value': round(total_stock_value, 2),
-                'monthly_orders': monthly_orders,
-                'monthly_sales': round(monthly_sales, 2)
-            }
+            'stats': dashboard_stats()
         })
     
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @reports_bp.route('/reports/low-stock', methods=['GET'])
+@cached_report()
 def get_low_stock_report():
-    """Rapport des produits en stock bas"""
+    """Rapport des produits en stock bas (pagination optionnelle limit/cursor)"""
     try:
-        products = Product.query.filter(
-            Product.stock_quantity <= Product.min_stock_level
-        ).order_by(Product.stock_quantity.asc()).all()
+        query = Product.query.filter(Product.is_low_stock == True)
         
-        return jsonify({
+        cursor = request.args.get('cursor')
+        limit = parse_limit(request.args.get('limit'), default=DEFAULT_PAGE_SIZE if cursor else None)
+        
+        if limit is None:
+            products = query.order_by(Product.stock_quantity.asc(), Product.id.asc()).all()
+            next_cursor = None
+        else:
+            products, next_cursor = keyset_paginate(
+                query, [Product.stock_quantity, Product.id], cursor=cursor, limit=limit
+            )
+        
+        response = {
             'success': True,
-            'products': [product.to_dict() for product in products],
+            'products': serialize_products(products),
             'count': len(products)
-        })
+        }
+        if limit is not None:
+            response['next_cursor'] = next_cursor
+            response['has_more'] = next_cursor is not None
+        return jsonify(response)
     
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Taille de page du rapport des mouvements (ancienne limite fixe de 1000 lignes)
+MOVEMENTS_PAGE_SIZE = 1000
+
 @reports_bp.route('/reports/stock-movements', methods=['GET'])
+@cached_report()
 def get_stock_movements_report():
-    """Rapport des mouvements de stock"""
+    """Rapport des mouvements de stock, du plus récent au plus ancien,
+    paginé par curseur sur (created_at, id)"""
     try:
         # Paramètres de filtrage
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
+        start_date = parse_date(request.args.get('start_date'))
+        end_date = parse_date(request.args.get('end_date'))
         product_id = request.args.get('product_id')
         movement_type = request.args.get('movement_type')
+        cursor = request.args.get('cursor')
+        limit = parse_limit(request.args.get('limit'), default=MOVEMENTS_PAGE_SIZE, maximum=MOVEMENTS_PAGE_SIZE)
         
         query = StockMovement.query
         
         if start_date:
-            query = query.filter(StockMovement.created_at >= datetime.fromisoformat(start_date))
+            query = query.filter(StockMovement.created_at >= start_date)
         
         if end_date:
-            query = query.filter(StockMovement.created_at <= datetime.fromisoformat(end_date))
+            query = query.filter(StockMovement.created_at <= end_date)
         
         if product_id:
-            query = query.filter(StockMovement.product_id == product_id)
+            try:
+                query = query.filter(StockMovement.product_id == int(product_id))
+            except ValueError:
+                return jsonify({'success': False, 'error': 'Identifiant de produit invalide'}), 400
         
         if movement_type:
-            query = query.filter(StockMovement.movement_type == movement_type)
+            try:
+                query = query.filter(StockMovement.movement_type == MovementType(movement_type))
+            except ValueError:
+                return jsonify({'success': False, 'error': 'Type de mouvement invalide'}), 400
         
-        movements = query.order_by(StockMovement.created_at.desc()).limit(1000).all()
+        movements, next_cursor = keyset_paginate(
+            query, [StockMovement.created_at, StockMovement.id], descending=True, cursor=cursor, limit=limit
+        )
         
         return jsonify({
             'success': True,
-            'movements': [movement.to_dict() for movement in movements],
-            'count': len(movements)
+            'movements': serialize_movements(movements),
+            'count': len(movements),
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
         })
     
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@reports_bp.route('/reports/stock-as-of', methods=['GET'])
+@cached_report()
+def get_stock_as_of_report():
+    """Stock de chaque produit à une date passée (date seule : fin de journée),
+    reconstitué à partir du point de contrôle le plus proche et du journal"""
+    try:
+        value = request.args.get('date')
+        if not value:
+            return jsonify({'success': False, 'error': 'Le paramètre date est requis'}), 400
+        as_of = parse_date(value)
+        if len(value) == 10:
+            as_of = datetime.combine(as_of.date(), time.max)
+        product_id = request.args.get('product_id', type=int)
+        
+        checkpoint, quantities = stock_as_of(as_of, product_id)
+        
+        query = Product.query.filter(db.or_(Product.created_at <= as_of, Product.id.in_(list(quantities))))
+        if product_id:
+            query = query.filter(Product.id == product_id)
+        products = query.order_by(Product.name).all()
+        
+        items = [
+            {
+                'product_id': product.id,
+                'name': product.name,
+                'reference': product.reference,
+                'category': product.category,
+                'stock_quantity': int(quantities.get(product.id, 0))
+            }
+            for product in products
+        ]
+        
+        return jsonify({
+            'success': True,
+            'as_of': as_of.isoformat(),
+            'checkpoint': checkpoint.isoformat() if checkpoint else None,
+            'products': items,
+            'summary': {
+                'total_products': len(items),
+                'total_quantity': sum(item['stock_quantity'] for item in items)
+            }
+        })
+    
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@reports_bp.route('/reports/stock-snapshots', methods=['POST'])
+def create_stock_snapshot():
+    """Enregistre un point de contrôle du stock de tous les produits"""
+    try:
+        taken_at, count = take_snapshot()
+        return jsonify({
+            'success': True,
+            'taken_at': taken_at.isoformat(),
+            'products_count': count,
+            'message': f'Point de contrôle enregistré pour {count} produit(s)'
+        }), 201
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+# Sections des rapports des ventes et des achats (paramètre include)
+REPORT_SECTIONS = ('summary', 'top', 'orders')
+
+def parse_sections(value):
+    """Sections demandées via include=summary,top,orders (toutes par défaut)"""
+    if not value:
+        return set(REPORT_SECTIONS)
+    sections = {section.strip() for section in value.split(',') if section.strip()}
+    unknown = sections - set(REPORT_SECTIONS)
+    if unknown:
+        raise ValueError(f"Section inconnue : {', '.join(sorted(unknown))} (valeurs possibles : {', '.join(REPORT_SECTIONS)})")
+    return sections
+
+def order_report(query, sections, summary, top_key, top, precomputed_copy=None):
+    """Réponse d'un rapport de commandes : seules les sections demandées sont
+    calculées ; la liste des commandes est paginée par curseur sur
+    (order_date, id) si limit ou cursor est fourni, ou diffusée en NDJSON.
+    Le résumé et le classement sont repris de `precomputed_copy` si fourni."""
+    header = {}
+    if precomputed_copy is not None:
+        payload, computed_at = precomputed_copy
+        if 'summary' in sections:
+            header['summary'] = payload['summary']
+        if 'top' in sections:
+            header[top_key] = payload[top_key]
+        header['computed_at'] = computed_at.isoformat()
+    else:
+        if 'summary' in sections:
+            header['summary'] = summary()
+        if 'top' in sections:
+            header[top_key] = top()
+    
+    if 'orders' not in sections:
+        return jsonify({'success': True, **header})
+    
+    # Mode flux : résumé en première ligne puis une commande par ligne
+    if wants_stream():
+        return stream_ndjson(query.order_by(Order.order_date.desc(), Order.id.desc()), serialize_orders, header=header)
+    
+    cursor = request.args.get('cursor')
+    limit = parse_limit(request.args.get('limit'), default=DEFAULT_PAGE_SIZE if cursor else None)
+    if limit is None:
+        orders = query.order_by(Order.order_date.desc(), Order.id.desc()).all()
+        return jsonify({'success': True, **header, 'orders': serialize_orders(orders)})
+    
+    orders, next_cursor = keyset_paginate(
+        query, [Order.order_date, Order.id], descending=True, cursor=cursor, limit=limit
+    )
+    return jsonify({
+        'success': True,
+        **header,
+        'orders': serialize_orders(orders),
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None
+    })
+
+def sales_summary(start_date, end_date):
+    """Totaux des ventes livrées sur la période"""
+    total_sales, total_orders = order_summary(OrderType.SALE, start_date, end_date)
+    return {
+        'total_sales': round(total_sales, 2),
+        'total_orders': total_orders,
+        'average_order_value': round(total_sales / total_orders if total_orders > 0 else 0, 2)
+    }
+
+def sales_top_products(start_date, end_date):
+    """Produits les plus vendus sur la période"""
+    return [
+        {
+            'name': product['name'],
+            'reference': product['reference'],
+            'quantity_sold': product['quantity'],
+            'total_amount': product['total_amount']
+        }
+        for product in rollup_top_products(OrderType.SALE, start_date, end_date)
+    ]
+
+def purchases_summary(start_date, end_date, supplier_id=None):
+    """Totaux des achats réceptionnés sur la période"""
+    total_purchases, total_orders = order_summary(OrderType.PURCHASE, start_date, end_date, supplier_id=supplier_id)
+    return {
+        'total_purchases': round(total_purchases, 2),
+        'total_orders': total_orders,
+        'average_order_value': round(total_purchases / total_orders if total_orders > 0 else 0, 2)
+    }
+
 @reports_bp.route('/reports/sales', methods=['GET'])
+@cached_report()
 def get_sales_report():
-    """Rapport des ventes"""
+    """Rapport des ventes (résumé et classement servis par les agrégats journaliers)"""
     try:
         # Paramètres de filtrage
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
+        start_date = parse_date(request.args.get('start_date'))
+        end_date = parse_date(request.args.get('end_date'))
+        sections = parse_sections(request.args.get('include'))
         
         query = Order.query.filter(
             Order.order_type == OrderType.SALE,
@@ -127,184 +342,270 @@ def get_sales_report():
         )
         
         if start_date:
-            query = query.filter(Order.order_date >= datetime.fromisoformat(start_date))
+            query = query.filter(Order.order_date >= start_date)
         
         if end_date:
-            query = query.filter(Order.order_date <= datetime.fromisoformat(end_date))
-        
-        orders = query.order_by(Order.order_date.desc()).all()
-        
-        # Calculs des totaux
-        total_sales = sum(order.total_amount for order in orders)
-        total_orders = len(orders)
-        
-        # Produits les plus vendus
-        product_sales = db.session.query(
-            Product.name,
-            Product.reference,
-            func.sum(OrderItem.quantity).label('total_quantity'),
-            func.sum(OrderItem.total_price).label('total_amount')
-        ).join(OrderItem).join(Order).filter(
-            Order.order_type == OrderType.SALE,
-            Order.status == OrderStatus.DELIVERED
+            query = query.filter(Order.order_date <= end_date)
+        
+        # Copie précalculée utilisable pour le rapport sans filtre de dates
+        copy = None
+        if not start_date and not end_date:
+            copy = precomputed('sales', parse_max_age(request.args.get('max_age')))
+        
+        return order_report(
+            query, sections,
+            lambda: sales_summary(start_date, end_date),
+            'top_products',
+            lambda: sales_top_products(start_date, end_date),
+            precomputed_copy=copy
         )
-        
-        if start_date:
-            product_sales = product_sales.filter(Order.order_date >= datetime.fromisoformat(start_date))
-        
-        if end_date:
-            product_sales = product_sales.filter(Order.order_date <= datetime.fromisoformat(end_date))
-        
-        top_products = product_sales.group_by(Product.id).order_by(
-            func.sum(OrderItem.quantity).desc()
-        ).limit(10).all()
-        
-        return jsonify({
-            'success': True,
-            'summary': {
-                'total_sales': round(total_sales, 2),
-                'total_orders': total_orders,
-                'average_order_value': round(total_sales / total_orders if total_orders > 0 else 0, 2)
-            },
-            'orders': [order.to_dict() for order in orders],
-            'top_products': [
-                {
-                    'name': product.name,
-                    'reference': product.reference,
-                    'quantity_sold': int(product.total_quantity),
-                    'total_amount': round(float(product.total_amount), 2)
-                }
-                for product in top_products
-            ]
-        })
     
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @reports_bp.route('/reports/purchases', methods=['GET'])
+@cached_report()
 def get_purchases_report():
-    """Rapport des achats"""
+    """Rapport des achats réceptionnés (résumé et classement servis par les agrégats journaliers)"""
     try:
         # Paramètres de filtrage
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        supplier_id = request.args.get('supplier_id')
+        start_date = parse_date(request.args.get('start_date'))
+        end_date = parse_date(request.args.get('end_date'))
+        supplier_id = request.args.get('supplier_id', type=int)
+        sections = parse_sections(request.args.get('include'))
         
-        query = Order.query.filter(Order.order_type == OrderType.PURCHASE)
+        query = Order.query.filter(
+            Order.order_type == OrderType.PURCHASE,
+            Order.status == OrderStatus.DELIVERED
+        )
         
         if start_date:
-            query = query.filter(Order.order_date >= datetime.fromisoformat(start_date))
+            query = query.filter(Order.order_date >= start_date)
         
         if end_date:
-            query = query.filter(Order.order_date <= datetime.fromisoformat(end_date))
+            query = query.filter(Order.order_date <= end_date)
         
         if supplier_id:
             query = query.filter(Order.supplier_id == supplier_id)
         
-        orders = query.order_by(Order.order_date.desc()).all()
-        
-        # Calculs des totaux
-        total_purchases = sum(order.total_amount for order in orders)
-        total_orders = len(orders)
-        
-        # Achats par fournisseur
-        supplier_purchases = db.session.query(
-            Supplier.name,
-            func.count(Order.id).label('order_count'),
-            func.sum(Order.total_amount).label('total_amount')
-        ).join(Order).filter(Order.order_type == OrderType.PURCHASE)
-        
-        if start_date:
-            supplier_purchases = supplier_purchases.filter(Order.order_date >= datetime.fromisoformat(start_date))
-        
-        if end_date:
-            supplier_purchases = supplier_purchases.filter(Order.order_date <= datetime.fromisoformat(end_date))
+        # Copie précalculée utilisable pour le rapport sans filtre
+        copy = None
+        if not start_date and not end_date and not supplier_id:
+            copy = precomputed('purchases', parse_max_age(request.args.get('max_age')))
+        
+        return order_report(
+            query, sections,
+            lambda: purchases_summary(start_date, end_date, supplier_id or None),
+            'top_suppliers',
+            lambda: rollup_top_suppliers(OrderType.PURCHASE, start_date, end_date),
+            precomputed_copy=copy
+        )
+    
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@reports_bp.route('/reports/timeseries', methods=['GET'])
+@cached_report()
+def get_timeseries_report():
+    """Montant des ventes ou des achats livrés par jour, semaine ou mois,
+    avec ventilation facultative par catégorie ou fournisseur"""
+    try:
+        kind = request.args.get('kind', 'sale')
+        bucket = request.args.get('bucket', 'day')
+        breakdown = request.args.get('breakdown')
+        
+        try:
+            order_type = OrderType(kind)
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Le paramètre kind doit valoir sale ou purchase'}), 400
+        if bucket not in BUCKETS:
+            return jsonify({'success': False, 'error': f"Le paramètre bucket doit valoir {', '.join(BUCKETS)}"}), 400
+        if breakdown and breakdown not in BREAKDOWNS:
+            return jsonify({'success': False, 'error': f"Le paramètre breakdown doit valoir {', '.join(BREAKDOWNS)}"}), 400
+        
+        end = request.args.get('end')
+        end_date = parse_date(end) if end else datetime.now()
+        if end and len(end) == 10:
+            end_date = datetime.combine(end_date.date(), time.max)
+        start_date = parse_date(request.args.get('start')) or default_start(bucket, end_date)
+        if start_date > end_date:
+            return jsonify({'success': False, 'error': 'La date de début doit précéder la date de fin'}), 400
+        
+        series = order_timeseries(order_type, bucket, start_date, end_date, breakdown)
         
-        top_suppliers = supplier_purchases.group_by(Supplier.id).order_by(
-            func.sum(Order.total_amount).desc()
-        ).limit(10).all()
+        return jsonify({
+            'success': True,
+            'kind': order_type.value,
+            'bucket': bucket,
+            'start': start_date.isoformat(),
+            'end': end_date.isoformat(),
+            **series
+        })
+    
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@reports_bp.route('/reports/abc', methods=['GET', 'POST'])
+@cached_report()
+def get_abc_report():
+    """Classement ABC des produits (Pareto) sur une période ; en POST, la
+    classe calculée est enregistrée sur chaque produit"""
+    try:
+        metric = request.args.get('metric', 'revenue')
+        if metric not in METRICS:
+            return jsonify({'success': False, 'error': f"Le paramètre metric doit valoir {', '.join(METRICS)}"}), 400
+        a_cutoff, b_cutoff = parse_cutoffs(request.args.get('a'), request.args.get('b'))
+        start_date = parse_date(request.args.get('start_date'))
+        end_date = parse_date(request.args.get('end_date'))
+        if start_date is None and end_date is None:
+            # Par défaut : les douze derniers mois
+            start_date = datetime.combine((datetime.now() - timedelta(days=365)).date(), time.min)
+        
+        persist = request.method == 'POST'
+        report = classify_products(metric, start_date, end_date, a_cutoff, b_cutoff, persist=persist)
         
         return jsonify({
             'success': True,
-            'summary': {
-                'total_purchases': round(total_purchases, 2),
-                'total_orders': total_orders,
-                'average_order_value': round(total_purchases / total_orders if total_orders > 0 else 0, 2)
-            },
-            'orders': [order.to_dict() for order in orders],
-            'top_suppliers': [
-                {
-                    'name': supplier.name,
-                    'order_count': int(supplier.order_count),
-                    'total_amount': round(float(supplier.total_amount), 2)
-                }
-                for supplier in top_suppliers
-            ]
+            'metric': metric,
+            'cutoffs': {'a': a_cutoff, 'b': b_cutoff},
+            'start_date': start_date.isoformat() if start_date else None,
+            'end_date': end_date.isoformat() if end_date else None,
+            'persisted': persist,
+            **report
         })
     
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
+        db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@reports_bp.route('/reports/inventory-value', methods=['GET'])
-def get_inventory_value_report():
-    """Rapport de la valeur de l'inventaire"""
+@reports_bp.route('/reports/valuation', methods=['GET'])
+@cached_report()
+def get_valuation_report():
+    """Valorisation du stock au coût moyen pondéré et en FIFO, à partir des
+    coûts d'entrée enregistrés sur les mouvements"""
     try:
-        # Valeur par catégorie
-        category_values = db.session.query(
-            Product.category,
-            func.sum(Product.stock_quantity * Product.unit_price).label('total_value'),
-            func.sum(Product.stock_quantity).label('total_quantity'),
-            func.count(Product.id).label('product_count')
-        ).group_by(Product.category).order_by(
-            func.sum(Product.stock_quantity * Product.unit_price).desc()
-        ).all()
-        
-        # Valeur par fournisseur
-        supplier_values = db.session.query(
-            Supplier.name,
-            func.sum(Product.stock_quantity * Product.unit_price).label('total_value'),
-            func.sum(Product.stock_quantity).label('total_quantity'),
-            func.count(Product.id).label('product_count')
-        ).join(Product).group_by(Supplier.id).order_by(
-            func.sum(Product.stock_quantity * Product.unit_price).desc()
-        ).all()
-        
-        # Valeur totale
-        total_value = db.session.query(
-            func.sum(Product.stock_quantity * Product.unit_price)
-        ).scalar() or 0
-        
-        total_quantity = db.session.query(
-            func.sum(Product.stock_quantity)
-        ).scalar() or 0
+        products = stock_valuation(request.args.get('category'))
+        
+        by_category = {}
+        for product in products:
+            totals = by_category.setdefault(product['category'], {
+                'category': product['category'],
+                'total_quantity': 0,
+                'weighted_average_value': 0.0,
+                'fifo_value': 0.0,
+                'retail_value': 0.0
+            })
+            totals['total_quantity'] += product['stock_quantity'] or 0
+            for key in ('weighted_average_value', 'fifo_value', 'retail_value'):
+                totals[key] += product[key]
+        for totals in by_category.values():
+            for key in ('weighted_average_value', 'fifo_value', 'retail_value'):
+                totals[key] = round(totals[key], 2)
         
         return jsonify({
             'success': True,
             'summary': {
-                'total_value': round(total_value, 2),
-                'total_quantity': int(total_quantity),
-                'total_products': Product.query.count()
+                'total_quantity': sum(product['stock_quantity'] or 0 for product in products),
+                'weighted_average_value': round(sum(product['weighted_average_value'] for product in products), 2),
+                'fifo_value': round(sum(product['fifo_value'] for product in products), 2),
+                'retail_value': round(sum(product['retail_value'] for product in products), 2)
             },
-            'by_category': [
-                {
-                    'category': cat.category,
-                    'total_value': round(float(cat.total_value), 2),
-                    'total_quantity': int(cat.total_quantity),
-                    'product_count': int(cat.product_count)
-                }
-                for cat in category_values
-            ],
-            'by_supplier': [
-                {
-                    'supplier_name': sup.name,
-                    'total_value': round(float(sup.total_value), 2),
-                    'total_quantity': int(sup.total_quantity),
-                    'product_count': int(sup.product_count)
-                }
-                for sup in supplier_values
-            ]
+            'by_category': sorted(by_category.values(), key=lambda totals: totals['fifo_value'], reverse=True),
+            'products': products
         })
     
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def inventory_value():
+    """Valeur de l'inventaire au coût : totaux, par catégorie et par fournisseur.
+    
+    total_value est la valeur FIFO (couches de coût restantes) ; la valeur
+    au coût moyen pondéré et la valeur au prix de vente sont jointes.
+    """
+    layers = db.session.query(
+        CostLayer.product_id,
+        func.sum(CostLayer.remaining_quantity * CostLayer.unit_cost).label('fifo_value')
+    ).group_by(CostLayer.product_id).subquery()
+    quantity = func.coalesce(Product.stock_quantity, 0)
+    values = (
+        func.coalesce(func.sum(layers.c.fifo_value), 0).label('fifo_value'),
+        func.coalesce(func.sum(quantity * func.coalesce(Product.average_cost, 0)), 0).label('weighted_average_value'),
+        func.coalesce(func.sum(quantity * Product.unit_price), 0).label('retail_value'),
+        func.coalesce(func.sum(quantity), 0).label('total_quantity'),
+        func.count(Product.id).label('product_count')
+    )
+    
+    def query(*columns):
+        return db.session.query(*columns, *values).select_from(Product).outerjoin(
+            layers, layers.c.product_id == Product.id
+        )
+    
+    def amounts(row):
+        return {
+            'total_value': round(float(row.fifo_value), 2),
+            'fifo_value': round(float(row.fifo_value), 2),
+            'weighted_average_value': round(float(row.weighted_average_value), 2),
+            'retail_value': round(float(row.retail_value), 2),
+            'total_quantity': int(row.total_quantity),
+            'product_count': int(row.product_count)
+        }
+    
+    totals = query().one()
+    # Valeur par catégorie
+    category_values = query(Product.category).group_by(Product.category).order_by(values[0].desc()).all()
+    # Valeur par fournisseur
+    supplier_values = query(Supplier.name).join(Supplier, Supplier.id == Product.supplier_id).group_by(
+        Supplier.id
+    ).order_by(values[0].desc()).all()
+    
+    summary = amounts(totals)
+    summary['total_products'] = summary.pop('product_count')
+    return {
+        'valuation_method': 'fifo',
+        'summary': summary,
+        'by_category': [{'category': row.category, **amounts(row)} for row in category_values],
+        'by_supplier': [{'supplier_name': row.name, **amounts(row)} for row in supplier_values]
+    }
+
+@reports_bp.route('/reports/inventory-value', methods=['GET'])
+@cached_report()
+def get_inventory_value_report():
+    """Rapport de la valeur de l'inventaire (copie précalculée si elle est à
+    jour ou plus récente que max_age secondes)"""
+    try:
+        copy = precomputed('inventory-value', parse_max_age(request.args.get('max_age')))
+        if copy is not None:
+            payload, computed_at = copy
+            return jsonify({'success': True, **payload, 'computed_at': computed_at.isoformat()})
+        
+        return jsonify({'success': True, **inventory_value()})
+    
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+# Rapports recalculés en arrière-plan par le planificateur (src/services/precompute.py)
+register_report('inventory-value', inventory_value)
+register_report('sales', lambda: {
+    'summary': sales_summary(None, None),
+    'top_products': sales_top_products(None, None)
+})
+register_report('purchases', lambda: {
+    'summary': purchases_summary(None, None),
+    'top_suppliers': rollup_top_suppliers(OrderType.PURCHASE, None, None)
+})
+
+@reports_bp.route('/reports/cache-stats', methods=['GET'])
+def get_cache_stats():
+    """Compteurs du cache des rapports (succès, échecs, évictions, taille)"""
+    return jsonify({'success': True, 'cache': cache_stats()})
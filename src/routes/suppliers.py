@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
-from src.models import db, Supplier, Product
+from src.models import db, Supplier, Product, Order
+from src.models.serializers import serialize_products, serialize_suppliers
 from datetime import datetime
 
 suppliers_bp = Blueprint('suppliers', __name__)
@@ -32,7 +33,7 @@ def get_suppliers():
         
         return jsonify({
             'success': True,
-            'suppliers': [supplier.to_dict() for supplier in suppliers],
+            'suppliers': serialize_suppliers(suppliers),
             'count': len(suppliers)
         })
     
@@ -146,7 +147,10 @@ def delete_supplier(supplier_id):
             }), 400
         
         # Vérifier s'il y a des commandes liées
-        if supplier.orders:
+        has_orders = db.session.query(
+            Order.query.filter_by(supplier_id=supplier_id).exists()
+        ).scalar()
+        if has_orders:
             return jsonify({
                 'success': False, 
                 'error': 'Impossible de supprimer ce fournisseur car il est lié à des commandes'
@@ -174,7 +178,7 @@ def get_supplier_products(supplier_id):
         return jsonify({
             'success': True,
             'supplier_name': supplier.name,
-            'products': [product.to_dict() for product in products],
+            'products': serialize_products(products),
             'count': len(products)
         })
     
@@ -0,0 +1,114 @@
+import numpy as np
+from sqlalchemy import bindparam, func, select, update
+from src.models import db, Product, StockMovement, OrderType
+from src.services.rollups import product_totals
+
+METRICS = ('revenue', 'margin', 'movements')
+ABC_CLASSES = ('A', 'B', 'C')
+
+# Parts cumulées par défaut : A jusqu'à 80 % de la valeur, B jusqu'à 95 %
+DEFAULT_A_CUTOFF = 0.8
+DEFAULT_B_CUTOFF = 0.95
+
+# Taille des lots d'écriture des classes
+BATCH_SIZE = 5000
+
+def parse_cutoffs(a_value, b_value):
+    """Valide les seuils de parts cumulées des classes A et B"""
+    try:
+        a_cutoff = float(a_value) if a_value not in (None, '') else DEFAULT_A_CUTOFF
+        b_cutoff = float(b_value) if b_value not in (None, '') else DEFAULT_B_CUTOFF
+    except (TypeError, ValueError):
+        raise ValueError('Seuils de classe invalides')
+    if not 0 < a_cutoff < b_cutoff <= 1:
+        raise ValueError('Les seuils doivent vérifier 0 < a < b <= 1')
+    return a_cutoff, b_cutoff
+
+def _metric_values(metric, product_ids, costs, start, end):
+    """Valeur de chaque produit pour le critère choisi, alignée sur product_ids"""
+    values = np.zeros(len(product_ids))
+    index = {product_id: position for position, product_id in enumerate(product_ids)}
+    
+    if metric == 'movements':
+        query = db.session.query(StockMovement.product_id, func.count(StockMovement.id))
+        if start is not None:
+            query = query.filter(StockMovement.created_at >= start)
+        if end is not None:
+            query = query.filter(StockMovement.created_at <= end)
+        for product_id, count in query.group_by(StockMovement.product_id).all():
+            if product_id in index:
+                values[index[product_id]] = count
+        return values
+    
+    quantities = np.zeros(len(product_ids))
+    for product_id, (quantity, amount) in product_totals(OrderType.SALE, start, end).items():
+        if product_id in index:
+            values[index[product_id]] = amount
+            quantities[index[product_id]] = quantity
+    if metric == 'margin':
+        # Marge estimée au coût moyen pondéré courant
+        values = values - quantities * costs
+    return values
+
+def classify_products(metric='revenue', start=None, end=None, a_cutoff=DEFAULT_A_CUTOFF,
+                      b_cutoff=DEFAULT_B_CUTOFF, persist=False):
+    """Classement ABC (Pareto) des produits sur la période.
+    
+    Les produits sont triés par valeur décroissante puis la part cumulée est
+    calculée avec np.cumsum : un produit est en A si la part cumulée avant lui
+    est inférieure au seuil a, en B sous le seuil b, sinon en C (de même pour
+    tout produit de valeur nulle ou négative). Avec persist=True la classe est
+    enregistrée sur Product.abc_class.
+    """
+    catalogue = db.session.execute(
+        select(Product.id, Product.name, Product.reference, Product.category, Product.average_cost).order_by(Product.id)
+    ).all()
+    product_ids = [row.id for row in catalogue]
+    costs = np.array([row.average_cost or 0.0 for row in catalogue])
+    values = _metric_values(metric, product_ids, costs, start, end)
+    
+    order = np.argsort(-values, kind='stable')
+    ranked = values[order]
+    positive = np.clip(ranked, 0, None)
+    total = positive.sum()
+    cumulative = np.cumsum(positive) / total if total > 0 else np.zeros(len(ranked))
+    before = cumulative - (positive / total if total > 0 else 0)
+    classes = np.where(before < a_cutoff, 'A', np.where(before < b_cutoff, 'B', 'C'))
+    classes[ranked <= 0] = 'C'
+    
+    products = [
+        {
+            'product_id': catalogue[position].id,
+            'name': catalogue[position].name,
+            'reference': catalogue[position].reference,
+            'category': catalogue[position].category,
+            'value': round(float(ranked[rank]), 2),
+            'cumulative_share': round(float(cumulative[rank]), 4),
+            'abc_class': str(classes[rank])
+        }
+        for rank, position in enumerate(order)
+    ]
+    
+    summary = {}
+    for abc_class in ABC_CLASSES:
+        mask = classes == abc_class
+        summary[abc_class] = {
+            'products_count': int(mask.sum()),
+            'products_share': round(float(mask.mean()), 4) if len(mask) else 0.0,
+            'value': round(float(ranked[mask].sum()), 2),
+            'value_share': round(float(positive[mask].sum() / total), 4) if total > 0 else 0.0
+        }
+    
+    if persist and products:
+        # updated_at reporté tel quel : une classe calculée n'est pas une modification du produit
+        products_table = Product.__table__
+        statement = update(products_table).where(products_table.c.id == bindparam('product_id')).values(
+            abc_class=bindparam('cls'),
+            updated_at=products_table.c.updated_at
+        )
+        rows = [{'product_id': product['product_id'], 'cls': product['abc_class']} for product in products]
+        for start_row in range(0, len(rows), BATCH_SIZE):
+            db.session.execute(statement, rows[start_row:start_row + BATCH_SIZE])
+        db.session.commit()
+    
+    return {'summary': summary, 'products': products, 'total_value': round(float(values.sum()), 2)}
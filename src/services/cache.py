@@ -0,0 +1,146 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, make_response, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from src.services.streaming import wants_stream
+
+# Tables dont l'écriture invalide les résultats mis en cache
+WATCHED_TABLES = {
+    'products', 'suppliers', 'orders', 'order_items', 'stock_movements',
+    'cost_layers', 'stock_snapshots', 'stock_reservations'
+}
+
+# Nombre maximal d'entrées conservées (les moins récemment lues sont évincées)
+MAX_ENTRIES = 256
+
+# Durée de vie par défaut d'un rapport en cache (secondes) : borne les
+# résultats qui dépendent de l'heure courante (périodes par défaut)
+REPORT_TTL = 300
+
+_lock = threading.Lock()
+_version = 0
+_entries = OrderedDict()
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+_listeners = []
+
+def data_version():
+    """Numéro de version des données, incrémenté à chaque commit qui écrit
+    dans une table surveillée"""
+    return _version
+
+def invalidate():
+    """Invalide toutes les entrées du cache et prévient les abonnés"""
+    global _version
+    with _lock:
+        _version += 1
+        _entries.clear()
+        version = _version
+    for listener in list(_listeners):
+        listener(version)
+
+def add_invalidation_listener(listener):
+    """Abonne `listener(version)` aux changements de version des données"""
+    _listeners.append(listener)
+
+def cache_stats():
+    """Compteurs du cache : succès, échecs, évictions, taille et version"""
+    with _lock:
+        lookups = _stats['hits'] + _stats['misses']
+        return {
+            **_stats,
+            'hit_rate': round(_stats['hits'] / lookups, 4) if lookups else 0.0,
+            'entries': len(_entries),
+            'max_entries': MAX_ENTRIES,
+            'data_version': _version
+        }
+
+def _lookup(key, now):
+    """Entrée valide sous `key` (None sinon) et version courante, sous verrou"""
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and entry[0] == _version and entry[1] > now:
+            _entries.move_to_end(key)
+            _stats['hits'] += 1
+            return entry[2], _version
+        _stats['misses'] += 1
+        return None, _version
+
+def _store(key, version, expires_at, value):
+    with _lock:
+        # Une écriture validée pendant le calcul rend la valeur déjà périmée
+        if version != _version:
+            return
+        _entries[key] = (version, expires_at, value)
+        _entries.move_to_end(key)
+        while len(_entries) > MAX_ENTRIES:
+            _entries.popitem(last=False)
+            _stats['evictions'] += 1
+
+def request_key():
+    """Clé d'une requête : point d'entrée, paramètres de chemin et paramètres
+    de requête normalisés (triés, valeurs vides ignorées)"""
+    args = tuple(
+        (name, tuple(values))
+        for name, values in sorted(request.args.lists())
+        if any(values)
+    )
+    return (request.endpoint, tuple(sorted((request.view_args or {}).items())), args)
+
+def cached_report(ttl=REPORT_TTL):
+    """Met en cache les réponses 200 d'un GET de rapport, jusqu'à la
+    prochaine écriture validée ou au plus `ttl` secondes.
+    
+    Les réponses en flux (NDJSON) et les autres méthodes ne sont pas mises en
+    cache. L'en-tête X-Cache indique HIT ou MISS.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or wants_stream():
+                return view(*args, **kwargs)
+            
+            key = request_key()
+            now = time.monotonic()
+            stored, version = _lookup(key, now)
+            if stored is not None:
+                response = Response(stored[0], mimetype=stored[1])
+                response.headers['X-Cache'] = 'HIT'
+                return response
+            
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                _store(key, version, now + ttl, (response.get_data(), response.mimetype))
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        
+        return wrapper
+    return decorator
+
+def _mark(session, table_names):
+    written = table_names & WATCHED_TABLES
+    if written:
+        session.info.setdefault('written_tables', set()).update(written)
+
+@event.listens_for(Session, 'after_flush')
+def _track_flush(session, flush_context):
+    instances = list(session.new) + list(session.dirty) + list(session.deleted)
+    _mark(session, {getattr(instance, '__tablename__', None) for instance in instances})
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_statement(orm_execute_state):
+    # INSERT/UPDATE/DELETE en masse, qui ne passent pas par le flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        _mark(orm_execute_state.session, {getattr(table, 'name', None)})
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session):
+    if session.info.pop('written_tables', None):
+        invalidate()
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_on_rollback(session):
+    session.info.pop('written_tables', None)
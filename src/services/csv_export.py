@@ -0,0 +1,86 @@
+import csv
+import io
+import zlib
+from datetime import datetime
+from enum import Enum
+from sqlalchemy import select
+from src.models import db, Product, Supplier, Order, OrderItem, StockMovement
+
+# Nombre de lignes lues par lot sur le curseur côté serveur
+BATCH_SIZE = 2000
+
+EXPORT_ENTITIES = ('products', 'suppliers', 'orders', 'order_items', 'stock_movements')
+
+def _export_definitions():
+    """Requête de base et colonne de date filtrée de chaque entité exportable.
+    Les articles de commande et les mouvements sont complétés par la
+    référence du produit (et le numéro de commande) pour la comptabilité."""
+    products, suppliers = Product.__table__, Supplier.__table__
+    orders, order_items, movements = Order.__table__, OrderItem.__table__, StockMovement.__table__
+    return {
+        'products': (select(products).order_by(products.c.id), products.c.updated_at),
+        'suppliers': (select(suppliers).order_by(suppliers.c.id), suppliers.c.updated_at),
+        'orders': (select(orders).order_by(orders.c.id), orders.c.order_date),
+        'order_items': (
+            select(
+                order_items,
+                orders.c.order_number,
+                orders.c.order_type,
+                orders.c.order_date,
+                products.c.reference.label('product_reference')
+            ).join(orders, orders.c.id == order_items.c.order_id).join(
+                products, products.c.id == order_items.c.product_id
+            ).order_by(order_items.c.id),
+            orders.c.order_date
+        ),
+        'stock_movements': (
+            select(movements, products.c.reference.label('product_reference')).join(
+                products, products.c.id == movements.c.product_id
+            ).order_by(movements.c.id),
+            movements.c.created_at
+        )
+    }
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def csv_chunks(entity, start=None, end=None, batch_size=BATCH_SIZE):
+    """Générateur des lignes CSV d'une entité (en-tête puis un bloc de texte
+    par lot), filtrées sur [start, end] par la colonne de date de l'entité.
+    
+    Les lignes sont lues en tuples sur un curseur côté serveur (yield_per /
+    stream_results) sans charger d'objet ORM : la mémoire reste constante
+    quelle que soit la taille de la table.
+    """
+    statement, date_column = _export_definitions()[entity]
+    if start is not None:
+        statement = statement.where(date_column >= start)
+    if end is not None:
+        statement = statement.where(date_column <= end)
+    
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    result = db.session.execute(statement, execution_options={'yield_per': batch_size, 'stream_results': True})
+    writer.writerow(result.keys())
+    yield buffer.getvalue()
+    
+    for rows in result.partitions():
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_cell(value) for value in row] for row in rows)
+        yield buffer.getvalue()
+
+def gzip_chunks(chunks):
+    """Compresse un flux de blocs de texte au format gzip, au fil de l'eau"""
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,133 @@
+import math
+from datetime import datetime, timedelta
+from statistics import NormalDist
+import numpy as np
+from sqlalchemy import func, select, update
+from src.models import db, Product, StockMovement, MovementType
+
+# Paramètres par défaut du calcul des points de commande
+DEFAULT_LOOKBACK_DAYS = 365
+DEFAULT_LEAD_TIME_DAYS = 7
+DEFAULT_SERVICE_LEVEL = 0.95
+
+# Taille des lots de lecture de l'historique et d'écriture des seuils
+BATCH_SIZE = 5000
+
+def parse_parameters(data):
+    """Valide les paramètres du calcul (corps JSON ou options de la commande)"""
+    try:
+        lookback_days = int(data.get('lookback_days') or DEFAULT_LOOKBACK_DAYS)
+        lead_time_days = float(data.get('lead_time_days') or DEFAULT_LEAD_TIME_DAYS)
+        service_level = float(data.get('service_level') or DEFAULT_SERVICE_LEVEL)
+    except (TypeError, ValueError):
+        raise ValueError('Paramètres de calcul invalides')
+    if lookback_days < 1 or lead_time_days <= 0:
+        raise ValueError('La période d\'historique et le délai de réapprovisionnement doivent être positifs')
+    if not 0.5 <= service_level < 1:
+        raise ValueError('Le taux de service doit être compris entre 0.5 et 1')
+    return lookback_days, lead_time_days, service_level
+
+def demand_statistics(product_ids, since, days):
+    """Demande journalière moyenne et écart-type de chaque produit, sur `days`
+    jours (les jours sans sortie comptent pour zéro).
+    
+    Les sorties sont agrégées par produit et par jour en SQL, puis cumulées
+    par lots avec np.bincount : la mémoire ne dépend que du nombre de produits.
+    """
+    sums = np.zeros(len(product_ids))
+    squares = np.zeros(len(product_ids))
+    day = func.date(StockMovement.created_at)
+    statement = select(
+        StockMovement.product_id, func.sum(StockMovement.quantity)
+    ).where(
+        StockMovement.movement_type == MovementType.OUT,
+        StockMovement.created_at >= since
+    ).group_by(StockMovement.product_id, day)
+    
+    result = db.session.execute(statement, execution_options={'yield_per': BATCH_SIZE})
+    for rows in result.partitions():
+        batch = np.array(rows, dtype=np.float64).reshape(-1, 2)
+        positions = np.searchsorted(product_ids, batch[:, 0])
+        known = (positions < len(product_ids)) & (product_ids[np.minimum(positions, len(product_ids) - 1)] == batch[:, 0])
+        positions, quantities = positions[known], batch[known, 1]
+        sums += np.bincount(positions, weights=quantities, minlength=len(product_ids))
+        squares += np.bincount(positions, weights=quantities ** 2, minlength=len(product_ids))
+    
+    mean = sums / days
+    variance = np.maximum(squares / days - mean ** 2, 0.0)
+    return mean, np.sqrt(variance), sums > 0
+
+def suggest_reorder_points(lookback_days=DEFAULT_LOOKBACK_DAYS, lead_time_days=DEFAULT_LEAD_TIME_DAYS,
+                           service_level=DEFAULT_SERVICE_LEVEL, apply=False):
+    """Calcule un seuil de réapprovisionnement (min_stock_level) par produit.
+    
+    Point de commande = demande moyenne x délai + stock de sécurité, avec
+    stock de sécurité = z x écart-type journalier x racine(délai). Les produits
+    sans sortie sur la période gardent leur seuil. Avec apply=True les
+    nouveaux seuils sont écrits en masse ; sinon le rapport est seulement
+    retourné (simulation).
+    """
+    catalogue = db.session.execute(
+        select(Product.id, Product.reference, Product.min_stock_level, Product.stock_quantity).order_by(Product.id)
+    ).all()
+    report = {
+        'applied': apply,
+        'lookback_days': lookback_days,
+        'lead_time_days': lead_time_days,
+        'service_level': service_level,
+        'products_analyzed': len(catalogue),
+        'products_with_history': 0,
+        'changes': []
+    }
+    if not catalogue:
+        return report
+    product_ids = np.array([row.id for row in catalogue], dtype=np.float64)
+    current = np.array([row.min_stock_level if row.min_stock_level is not None else 10 for row in catalogue])
+    stock = np.array([row.stock_quantity or 0 for row in catalogue])
+    
+    since = datetime.utcnow() - timedelta(days=lookback_days)
+    mean, deviation, has_history = demand_statistics(product_ids, since, lookback_days)
+    
+    z = NormalDist().inv_cdf(service_level)
+    safety_stock = z * deviation * math.sqrt(lead_time_days)
+    reorder_point = np.ceil(mean * lead_time_days + safety_stock).astype(np.int64)
+    changed = np.flatnonzero(has_history & (reorder_point != current))
+    
+    changes = [
+        {
+            'product_id': catalogue[index].id,
+            'reference': catalogue[index].reference,
+            'current_min_stock_level': int(current[index]),
+            'suggested_min_stock_level': int(reorder_point[index]),
+            'daily_demand': round(float(mean[index]), 3),
+            'demand_std': round(float(deviation[index]), 3),
+            'safety_stock': round(float(safety_stock[index]), 2),
+            'stock_quantity': int(stock[index])
+        }
+        for index in changed
+    ]
+    
+    if apply and changes:
+        now = datetime.utcnow()
+        rows = [
+            {
+                'id': change['product_id'],
+                'min_stock_level': change['suggested_min_stock_level'],
+                'updated_at': now
+            }
+            for change in changes
+        ]
+        for start in range(0, len(rows), BATCH_SIZE):
+            batch = rows[start:start + BATCH_SIZE]
+            db.session.execute(update(Product), batch)
+            # Indicateur de stock bas recalculé en SQL sur le stock courant
+            db.session.execute(
+                update(Product).where(Product.id.in_([row['id'] for row in batch])).values(
+                    is_low_stock=Product.stock_quantity <= Product.min_stock_level
+                ),
+                execution_options={'synchronize_session': False}
+            )
+        db.session.commit()
+    
+    report.update(products_with_history=int(has_history.sum()), changes=changes)
+    return report
@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import Response, jsonify, make_response, request
+from sqlalchemy.exc import IntegrityError
+from src.models import db, IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+KEY_TTL = timedelta(hours=24)
+# Une clé réservée sans réponse au-delà de ce délai est abandonnée (processus
+# interrompu avant son commit) : elle peut être réservée à nouveau
+CLAIM_LEASE = timedelta(seconds=60)
+MAX_KEY_LENGTH = 100
+
+# Les clés expirées sont purgées toutes les PURGE_INTERVAL nouvelles clés
+PURGE_INTERVAL = 100
+_claims_since_purge = 0
+
+def idempotent(view):
+    """Rend un POST rejouable : une requête répétée avec le même en-tête
+    Idempotency-Key renvoie la réponse mémorisée sans réexécuter l'écriture.
+    
+    L'écriture de la vue et la réponse mémorisée sont validées dans la même
+    transaction. Seules les réponses 2xx sont mémorisées ; après une erreur la
+    clé est libérée et la requête peut être retentée normalement.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({'success': False, 'error': f'{IDEMPOTENCY_HEADER} trop long'}), 400
+        
+        endpoint = f'{request.method} {request.path}'[:100]
+        stored = _claim(key, endpoint)
+        if stored is not None:
+            if stored.endpoint != endpoint:
+                return jsonify({'success': False, 'error': 'Clé d\'idempotence déjà utilisée pour une autre requête'}), 422
+            if stored.status_code is None:
+                return jsonify({'success': False, 'error': 'Requête en cours de traitement'}), 409
+            response = Response(stored.response_body, status=stored.status_code, mimetype='application/json')
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+        
+        session = db.session()
+        # Les commits de la vue deviennent des flush : le commit final valide
+        # ensemble l'écriture et la réponse mémorisée
+        session.commit = session.flush
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            del session.commit
+            _release(key)
+            raise
+        del session.commit
+        
+        if 200 <= response.status_code < 300:
+            try:
+                db.session.query(IdempotencyKey).filter_by(key=key).update({
+                    'status_code': response.status_code,
+                    'response_body': response.get_data(as_text=True)
+                })
+                db.session.commit()
+            except Exception:
+                _release(key)
+                raise
+        else:
+            _release(key)
+        return response
+    
+    return wrapper
+
+def _claim(key, endpoint):
+    """Réserve la clé ; retourne l'enregistrement existant si elle est déjà prise"""
+    global _claims_since_purge
+    now = datetime.utcnow()
+    
+    for _ in range(2):
+        try:
+            db.session.add(IdempotencyKey(key=key, endpoint=endpoint, created_at=now, expires_at=now + KEY_TTL))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            stored = db.session.get(IdempotencyKey, key)
+            if stored is None:
+                continue  # Supprimée entre-temps : nouvelle tentative
+            abandoned = stored.status_code is None and stored.created_at <= now - CLAIM_LEASE
+            if stored.expires_at > now and not abandoned:
+                return stored
+            # Clé expirée ou réservation abandonnée : elle est recyclée
+            db.session.delete(stored)
+            db.session.commit()
+        else:
+            _claims_since_purge += 1
+            if _claims_since_purge >= PURGE_INTERVAL:
+                _claims_since_purge = 0
+                purge_expired_keys()
+            return None
+    return db.session.get(IdempotencyKey, key)
+
+def _release(key):
+    db.session.rollback()
+    db.session.query(IdempotencyKey).filter_by(key=key).delete()
+    db.session.commit()
+
+def purge_expired_keys():
+    """Supprime les clés expirées (balayage de l'index sur expires_at)"""
+    deleted = db.session.query(IdempotencyKey).filter(
+        IdempotencyKey.expires_at <= datetime.utcnow()
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
@@ -0,0 +1,172 @@
+from datetime import datetime
+from sqlalchemy import insert, update
+from src.models import (
+    db, Product, StockMovement, MovementType, CostLayer,
+    InventoryCountLine, InventoryCountStatus
+)
+
+def _parse_id(value):
+    """Identifiant entier d'un produit (nombre ou chaîne JSON) ; ValueError sinon"""
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(value)
+    if not isinstance(value, (int, float, str)):
+        raise TypeError(value)
+    return int(value)
+
+def record_lines(count, lines):
+    """Enregistre un lot de quantités comptées (une ligne par produit, la dernière saisie l'emporte)"""
+    errors = []
+    counted = {}
+    references = {}
+    
+    for index, line in enumerate(lines):
+        if not isinstance(line, dict):
+            errors.append({'index': index, 'error': 'Ligne invalide'})
+            continue
+        try:
+            quantity = int(line.get('counted_quantity'))
+        except (TypeError, ValueError):
+            errors.append({'index': index, 'error': 'Quantité comptée invalide'})
+            continue
+        if quantity < 0:
+            errors.append({'index': index, 'error': 'La quantité comptée ne peut pas être négative'})
+            continue
+        
+        if line.get('product_id') is not None:
+            try:
+                product_id = _parse_id(line['product_id'])
+            except (TypeError, ValueError):
+                errors.append({'index': index, 'error': 'Identifiant de produit invalide'})
+                continue
+            counted[(index, 'id', product_id)] = quantity
+        elif line.get('reference'):
+            if not isinstance(line['reference'], str):
+                errors.append({'index': index, 'error': 'Référence invalide'})
+                continue
+            counted[(index, 'reference', line['reference'])] = quantity
+            references[line['reference']] = None
+        else:
+            errors.append({'index': index, 'error': 'product_id ou reference requis'})
+    
+    # Résolution des produits en deux requêtes (par id et par référence)
+    ids = {key for (_, kind, key) in counted if kind == 'id'}
+    known_ids = {product_id for product_id, in db.session.query(Product.id).filter(Product.id.in_(ids)).all()} if ids else set()
+    if references:
+        references.update(db.session.query(Product.reference, Product.id).filter(
+            Product.reference.in_(list(references))
+        ).all())
+    
+    quantities = {}
+    for (index, kind, key), quantity in counted.items():
+        product_id = key if kind == 'id' else references.get(key)
+        if product_id is None or (kind == 'id' and product_id not in known_ids):
+            errors.append({'index': index, 'error': f'Produit {key} introuvable'})
+            continue
+        quantities[product_id] = quantity
+    
+    if quantities:
+        existing = dict(db.session.query(InventoryCountLine.product_id, InventoryCountLine.id).filter(
+            InventoryCountLine.count_id == count.id,
+            InventoryCountLine.product_id.in_(list(quantities))
+        ).all())
+        now = datetime.utcnow()
+        new_lines = [
+            {'count_id': count.id, 'product_id': product_id, 'counted_quantity': quantity, 'counted_at': now}
+            for product_id, quantity in quantities.items() if product_id not in existing
+        ]
+        changed_lines = [
+            {'id': existing[product_id], 'counted_quantity': quantity, 'counted_at': now}
+            for product_id, quantity in quantities.items() if product_id in existing
+        ]
+        if new_lines:
+            db.session.execute(insert(InventoryCountLine), new_lines)
+        if changed_lines:
+            db.session.execute(update(InventoryCountLine), changed_lines)
+    
+    errors.sort(key=lambda error: error['index'])
+    return len(quantities), errors
+
+def compute_variances(count_id):
+    """Écarts entre quantités comptées et stock courant, en une requête"""
+    rows = db.session.query(
+        Product.id,
+        Product.name,
+        Product.reference,
+        Product.unit_price,
+        Product.stock_quantity,
+        Product.min_stock_level,
+        InventoryCountLine.counted_quantity
+    ).join(InventoryCountLine, InventoryCountLine.product_id == Product.id).filter(
+        InventoryCountLine.count_id == count_id
+    ).order_by(Product.id).all()
+    return rows
+
+def summarize_variances(rows):
+    """Résumé des écarts d'inventaire (quantités et valeur au prix unitaire)"""
+    variances = []
+    surplus = shortage = 0
+    variance_value = 0.0
+    for row in rows:
+        stock_quantity = row.stock_quantity or 0
+        difference = row.counted_quantity - stock_quantity
+        if difference == 0:
+            continue
+        if difference > 0:
+            surplus += difference
+        else:
+            shortage += -difference
+        variance_value += difference * row.unit_price
+        variances.append({
+            'product_id': row.id,
+            'product_name': row.name,
+            'product_reference': row.reference,
+            'previous_stock': stock_quantity,
+            'counted_quantity': row.counted_quantity,
+            'difference': difference,
+            'variance_value': round(difference * row.unit_price, 2)
+        })
+    
+    return {
+        'lines_counted': len(rows),
+        'products_adjusted': len(variances),
+        'surplus_quantity': surplus,
+        'shortage_quantity': shortage,
+        'variance_value': round(variance_value, 2),
+        'variances': variances
+    }
+
+def commit_count(count, created_by=None):
+    """Applique les écarts d'une session : mises à jour et mouvements ADJUSTMENT en une transaction"""
+    # Écrire d'abord le statut prend le verrou d'écriture : le stock lu ensuite ne peut plus changer
+    count.status = InventoryCountStatus.COMMITTED
+    count.committed_at = datetime.utcnow()
+    db.session.flush()
+    
+    rows = compute_variances(count.id)
+    summary = summarize_variances(rows)
+    thresholds = {row.id: row.min_stock_level for row in rows}
+    
+    product_updates, movements = [], []
+    for variance in summary['variances']:
+        product_id = variance['product_id']
+        new_stock = variance['counted_quantity']
+        product_updates.append({
+            'id': product_id,
+            'stock_quantity': new_stock,
+            'is_low_stock': new_stock <= thresholds[product_id],
+            'updated_at': count.committed_at
+        })
+        movements.append(StockMovement.build_row(
+            product_id, MovementType.ADJUSTMENT, variance['previous_stock'], new_stock,
+            reason=f'Inventaire n°{count.id}',
+            reference_type='inventory_count',
+            reference_id=count.id,
+            created_by=created_by or count.created_by,
+            created_at=count.committed_at
+        ))
+    
+    if product_updates:
+        db.session.execute(update(Product), product_updates)
+        CostLayer.record(movements)
+        db.session.execute(insert(StockMovement), movements)
+    return summary
@@ -0,0 +1,145 @@
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import insert
+from src.models import db, Order, OrderStatus, OrderType, StockMovement, MovementType, CostLayer
+from src.models.serializers import preload_order_items
+from src.services.reservations import reserve_items, release_orders, convert_orders
+from src.services.rollups import record_orders
+
+MAX_BULK_ORDERS = 500
+
+# Statuts d'une vente dont le stock reste réservé
+OPEN_STATUSES = (OrderStatus.PENDING, OrderStatus.CONFIRMED, OrderStatus.SHIPPED)
+
+def stock_delta(order, item):
+    """Écart de stock d'un article à la livraison (achat : entrée, vente : sortie)"""
+    return item.quantity if order.order_type == OrderType.PURCHASE else -item.quantity
+
+def update_reservations(order, old_status, new_status):
+    """Effet d'un changement de statut sur les réservations d'une vente :
+    solde à la livraison, libération à l'annulation, nouvelle réservation
+    si une vente annulée est rouverte."""
+    if order.order_type != OrderType.SALE:
+        return
+    if new_status == OrderStatus.DELIVERED:
+        convert_orders([order.id])
+    elif new_status == OrderStatus.CANCELLED:
+        release_orders([order.id])
+    elif old_status == OrderStatus.CANCELLED and new_status in OPEN_STATUSES:
+        reserve_items(order, order.order_items)
+
+def bulk_update_status(order_ids, new_status):
+    """Change le statut d'un lot de commandes dans la transaction courante.
+
+    Commandes, articles et produits sont chargés en amont ; pour les
+    livraisons, les écarts de stock sont cumulés par produit puis appliqués
+    en un UPDATE atomique par produit, et les mouvements insérés en masse.
+    Retourne un résultat par commande, dans l'ordre demandé.
+    """
+    orders = {order.id: order for order in Order.query.filter(Order.id.in_(set(order_ids))).all()}
+    preload_order_items(list(orders.values()))
+    
+    results = []
+    delivered = []
+    undelivered = []
+    closed_sales = []
+    running_stock = {}
+    now = datetime.utcnow()
+    
+    for order_id in order_ids:
+        order = orders.get(order_id)
+        if order is None:
+            results.append({'order_id': order_id, 'success': False, 'error': 'Commande introuvable'})
+            continue
+        result = {'order_id': order.id, 'order_number': order.order_number, 'old_status': order.status.value}
+        results.append(result)
+        
+        if order.status == new_status:
+            result.update(success=False, error=f'Commande déjà au statut {new_status.value}')
+            continue
+        
+        if new_status == OrderStatus.DELIVERED:
+            # Contrôle du stock sur le cumul des commandes déjà retenues dans le lot
+            deltas = defaultdict(int)
+            for item in order.order_items:
+                deltas[item.product] += stock_delta(order, item)
+            shortage = next((
+                product for product, delta in deltas.items()
+                if running_stock.get(product, product.stock_quantity) + delta < 0
+            ), None)
+            if shortage is not None:
+                result.update(success=False, error=f'Stock insuffisant pour {shortage.name}')
+                continue
+            for product, delta in deltas.items():
+                running_stock[product] = running_stock.get(product, product.stock_quantity) + delta
+            order.actual_delivery_date = now
+            delivered.append(order)
+        
+        if order.order_type == OrderType.SALE:
+            if new_status in (OrderStatus.DELIVERED, OrderStatus.CANCELLED):
+                closed_sales.append(order.id)
+            elif order.status == OrderStatus.CANCELLED and new_status in OPEN_STATUSES:
+                # Vente rouverte : nouvelle réservation, isolée pour ne pas faire échouer le lot
+                try:
+                    with db.session.begin_nested():
+                        reserve_items(order, order.order_items)
+                except ValueError as e:
+                    result.update(success=False, error=str(e))
+                    continue
+        
+        if order.status == OrderStatus.DELIVERED:
+            undelivered.append(order)
+        order.status = new_status
+        order.updated_at = now
+        result.update(success=True, status=new_status.value)
+    
+    # Réservations des ventes livrées (soldées) ou annulées (libérées), en une passe
+    if closed_sales:
+        if new_status == OrderStatus.DELIVERED:
+            convert_orders(closed_sales)
+        else:
+            release_orders(closed_sales)
+    if delivered:
+        _apply_deliveries(delivered, now)
+    # Agrégats journaliers : ajout des livraisons, retrait des livraisons annulées
+    record_orders(delivered, 1)
+    record_orders(undelivered, -1)
+    return results
+
+def _apply_deliveries(orders, now):
+    """Applique les écarts de stock cumulés et insère les mouvements en une fois"""
+    deltas = defaultdict(int)
+    for order in orders:
+        for item in order.order_items:
+            deltas[item.product] += stock_delta(order, item)
+    
+    current_stock = {}
+    for product, delta in sorted(deltas.items(), key=lambda entry: entry[0].id):
+        new_stock = StockMovement.apply_stock_delta(product, delta)
+        if new_stock is None:
+            raise ValueError(f'Stock insuffisant pour {product.name}')
+        current_stock[product.id] = new_stock - delta
+    
+    movements = []
+    for order in orders:
+        for item in order.order_items:
+            delta = stock_delta(order, item)
+            previous_stock = current_stock[item.product_id]
+            current_stock[item.product_id] = previous_stock + delta
+            if order.order_type == OrderType.PURCHASE:
+                movement_type, reason, unit_cost = MovementType.IN, f"Réception commande {order.order_number}", item.unit_price
+            else:
+                movement_type, reason, unit_cost = MovementType.OUT, f"Vente commande {order.order_number}", None
+            movements.append(StockMovement.build_row(
+                item.product_id, movement_type, previous_stock, previous_stock + delta,
+                reason=reason,
+                reference_type='order',
+                reference_id=order.id,
+                unit_cost=unit_cost,
+                created_by='System',
+                created_at=now
+            ))
+    
+    if movements:
+        CostLayer.record(movements)
+        db.session.execute(insert(StockMovement), movements)
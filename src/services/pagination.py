@@ -0,0 +1,77 @@
+import base64
+import json
+from datetime import datetime
+from src.models import db
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+def parse_limit(value, default=None, maximum=MAX_PAGE_SIZE):
+    """Convertit le paramètre limit en entier borné (None si absent et sans défaut)"""
+    if value is None or value == '':
+        return default
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('Le paramètre limit doit être un entier')
+    if limit < 1:
+        raise ValueError('Le paramètre limit doit être positif')
+    return min(limit, maximum)
+
+def encode_cursor(values):
+    """Encode les valeurs de la dernière ligne d'une page en curseur opaque"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, columns):
+    """Décode un curseur et reconvertit ses valeurs selon le type des colonnes"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError
+        decoded = []
+        for value, column in zip(values, columns):
+            if value is not None and column.type.python_type is datetime:
+                value = datetime.fromisoformat(value)
+            decoded.append(value)
+        return decoded
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError('Curseur de pagination invalide')
+
+def keyset_paginate(query, columns, descending=False, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Pagine une requête par clé (keyset) sur un tuple de colonnes ordonné.
+
+    La dernière colonne doit être unique (typiquement l'id) pour départager les
+    égalités. Retourne (lignes, curseur suivant ou None).
+    """
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        query = query.filter(_after(columns, values, descending))
+
+    ordering = [column.desc() if descending else column.asc() for column in columns]
+    rows = query.order_by(*ordering).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([_row_value(rows[-1], column) for column in columns])
+    return rows, next_cursor
+
+def _after(columns, values, descending):
+    """Construit la condition « strictement après » pour (c1, c2, ...) > (v1, v2, ...)"""
+    column, value = columns[0], values[0]
+    beyond = column < value if descending else column > value
+    if len(columns) == 1:
+        return beyond
+    return db.or_(beyond, db.and_(column == value, _after(columns[1:], values[1:], descending)))
+
+def _row_value(row, column):
+    """Lit la valeur d'une colonne sur un objet ORM ou une ligne (entité, colonnes...)"""
+    mapping = getattr(row, '_mapping', None)
+    if mapping is None:
+        return getattr(row, column.key)
+    if column.key in mapping:
+        return mapping[column.key]
+    return getattr(row[0], column.key)
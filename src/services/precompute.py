@@ -0,0 +1,114 @@
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from src.services.cache import data_version, add_invalidation_listener
+
+# Intervalle de recalcul par défaut (secondes) et nombre d'écritures validées
+# qui déclenchent un recalcul anticipé
+DEFAULT_INTERVAL = 300
+DEFAULT_WRITE_THRESHOLD = 50
+
+_lock = threading.Lock()
+_reports = {}
+_results = {}
+_scheduler = None
+
+def register_report(name, compute):
+    """Déclare un rapport à précalculer ; `compute()` retourne un dict
+    sérialisable et s'exécute dans un contexte d'application"""
+    _reports[name] = compute
+
+def parse_max_age(value):
+    """Âge maximal accepté (secondes) d'un rapport précalculé, None si absent"""
+    if value in (None, ''):
+        return None
+    try:
+        max_age = float(value)
+    except (TypeError, ValueError):
+        raise ValueError('max_age doit être un nombre de secondes')
+    if max_age < 0:
+        raise ValueError('max_age doit être positif')
+    return max_age
+
+def precomputed(name, max_age=None):
+    """Copie précalculée du rapport `name` et sa date de calcul, ou None.
+    
+    Sans max_age, la copie n'est servie que si aucune écriture n'a été validée
+    depuis son calcul ; avec max_age, elle l'est si elle a au plus max_age
+    secondes, même si des écritures ont eu lieu depuis. max_age=0 force le
+    calcul en direct.
+    """
+    with _lock:
+        result = _results.get(name)
+    if result is None:
+        return None
+    computed_at, computed_clock, version, payload = result
+    if max_age is None:
+        fresh = version == data_version()
+    else:
+        fresh = time.monotonic() - computed_clock <= max_age
+    return (payload, computed_at) if fresh else None
+
+def refresh(names=None):
+    """Recalcule les rapports déclarés (tous par défaut) ; un rapport en échec
+    garde sa copie précédente"""
+    for name in names or list(_reports):
+        version = data_version()
+        try:
+            payload = _reports[name]()
+        except Exception:
+            current_app.logger.exception('Précalcul du rapport %s en échec', name)
+            continue
+        with _lock:
+            _results[name] = (datetime.utcnow(), time.monotonic(), version, payload)
+
+class PrecomputeScheduler(threading.Thread):
+    """Thread de fond qui recalcule les rapports déclarés toutes les
+    `interval` secondes, ou plus tôt après `write_threshold` écritures validées"""
+    
+    def __init__(self, app, interval=DEFAULT_INTERVAL, write_threshold=DEFAULT_WRITE_THRESHOLD):
+        super().__init__(name='report-precompute', daemon=True)
+        self.app = app
+        self.interval = interval
+        self.write_threshold = write_threshold
+        self.computed_version = None
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        add_invalidation_listener(self.notify)
+    
+    def notify(self, version):
+        if self.computed_version is not None and version - self.computed_version >= self.write_threshold:
+            self._wake.set()
+    
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+    
+    def run(self):
+        while not self._stopped.is_set():
+            self._wake.clear()
+            self.computed_version = data_version()
+            with self.app.app_context():
+                refresh()
+            self._wake.wait(self.interval)
+
+def init_precompute(app):
+    """Démarre le planificateur à la première requête (pas lors des
+    commandes CLI). Configuration : REPORT_PRECOMPUTE_ENABLED,
+    REPORT_PRECOMPUTE_INTERVAL, REPORT_PRECOMPUTE_WRITES."""
+    app.config.setdefault('REPORT_PRECOMPUTE_ENABLED', True)
+    app.config.setdefault('REPORT_PRECOMPUTE_INTERVAL', DEFAULT_INTERVAL)
+    app.config.setdefault('REPORT_PRECOMPUTE_WRITES', DEFAULT_WRITE_THRESHOLD)
+    
+    @app.before_request
+    def start_precompute_scheduler():
+        global _scheduler
+        if _scheduler is not None or not app.config['REPORT_PRECOMPUTE_ENABLED']:
+            return
+        with _lock:
+            if _scheduler is None:
+                _scheduler = PrecomputeScheduler(
+                    app, app.config['REPORT_PRECOMPUTE_INTERVAL'], app.config['REPORT_PRECOMPUTE_WRITES']
+                )
+                _scheduler.start()
@@ -0,0 +1,190 @@
+import csv
+import io
+import json
+from datetime import datetime
+from sqlalchemy import insert, update
+from src.models import db, Product, Supplier, StockMovement, MovementType, CostLayer
+
+CHUNK_SIZE = 500
+
+IMPORT_MODES = ('insert', 'upsert')
+
+REQUIRED_FIELDS = ['name', 'category', 'reference', 'unit_price']
+
+# Champs mis à jour en mode upsert (mêmes champs que update_product)
+UPDATABLE_FIELDS = ['name', 'description', 'category', 'unit_price', 'min_stock_level', 'supplier_id']
+
+def read_csv_rows(stream, delimiter=','):
+    """Lit un flux CSV ligne à ligne : (numéro de ligne, dictionnaire)"""
+    text_stream = io.TextIOWrapper(io.BufferedReader(stream), encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(text_stream, delimiter=delimiter)
+    for row in reader:
+        yield reader.line_num, row
+
+def read_ndjson_rows(stream):
+    """Lit un flux NDJSON ligne à ligne : (numéro de ligne, objet ou erreur)"""
+    text_stream = io.TextIOWrapper(io.BufferedReader(stream), encoding='utf-8-sig')
+    for line_number, line in enumerate(text_stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = ValueError('JSON invalide')
+        yield line_number, row
+
+def parse_row(raw):
+    """Valide et convertit une ligne importée ; lève ValueError si invalide"""
+    if isinstance(raw, Exception):
+        raise raw
+    if not isinstance(raw, dict):
+        raise ValueError('Ligne invalide')
+    
+    row = {key.strip(): value.strip() if isinstance(value, str) else value
+           for key, value in raw.items() if key}
+    for field in REQUIRED_FIELDS:
+        if row.get(field) in (None, ''):
+            raise ValueError(f'Le champ {field} est requis')
+    
+    try:
+        unit_price = float(row['unit_price'])
+    except (TypeError, ValueError):
+        raise ValueError('Prix unitaire invalide')
+    
+    parsed = {
+        'name': str(row['name']),
+        'category': str(row['category']),
+        'reference': str(row['reference']),
+        'unit_price': unit_price
+    }
+    if row.get('description') is not None:
+        parsed['description'] = str(row['description'])
+    for field in ('stock_quantity', 'min_stock_level', 'supplier_id'):
+        if row.get(field) not in (None, ''):
+            try:
+                parsed[field] = int(row[field])
+            except (TypeError, ValueError):
+                raise ValueError(f'Le champ {field} doit être un entier')
+    if parsed.get('stock_quantity', 0) < 0:
+        raise ValueError('Le stock ne peut pas être négatif')
+    return parsed
+
+def import_products(rows, mode='insert', chunk_size=CHUNK_SIZE):
+    """Importe un flux de lignes (numéro, données) par lots.
+
+    Chaque lot est validé, contrôlé en une requête pour l'unicité des
+    références et l'existence des fournisseurs, puis inséré (produits et
+    mouvements « Stock initial ») en executemany et validé en une transaction.
+    """
+    report = {'processed': 0, 'created': 0, 'updated': 0, 'errors': []}
+    seen_references = set()
+    known_suppliers = set()
+    
+    chunk = []
+    for line_number, raw in rows:
+        report['processed'] += 1
+        try:
+            row = parse_row(raw)
+        except ValueError as e:
+            report['errors'].append({'line': line_number, 'error': str(e)})
+            continue
+        
+        if row['reference'] in seen_references:
+            report['errors'].append({
+                'line': line_number,
+                'reference': row['reference'],
+                'error': 'Référence en double dans le fichier'
+            })
+            continue
+        seen_references.add(row['reference'])
+        
+        chunk.append((line_number, row))
+        if len(chunk) >= chunk_size:
+            _import_chunk(chunk, mode, known_suppliers, report)
+            chunk = []
+    
+    if chunk:
+        _import_chunk(chunk, mode, known_suppliers, report)
+    return report
+
+def _import_chunk(chunk, mode, known_suppliers, report):
+    """Traite un lot de lignes valides dans une seule transaction"""
+    supplier_ids = {row['supplier_id'] for _, row in chunk if row.get('supplier_id')} - known_suppliers
+    if supplier_ids:
+        found = db.session.query(Supplier.id).filter(Supplier.id.in_(supplier_ids)).all()
+        known_suppliers.update(supplier_id for supplier_id, in found)
+    
+    references = [row['reference'] for _, row in chunk]
+    existing = {
+        product.reference: product
+        for product in db.session.query(
+            Product.id, Product.reference, Product.stock_quantity, Product.min_stock_level
+        ).filter(Product.reference.in_(references)).all()
+    }
+    
+    now = datetime.utcnow()
+    new_products, updates, movements = [], [], []
+    for line_number, row in chunk:
+        if row.get('supplier_id') and row['supplier_id'] not in known_suppliers:
+            report['errors'].append({'line': line_number, 'reference': row['reference'], 'error': 'Fournisseur introuvable'})
+            continue
+        
+        current = existing.get(row['reference'])
+        if current is None:
+            stock_quantity = row.get('stock_quantity', 0)
+            min_stock_level = row.get('min_stock_level', 10)
+            new_products.append(dict(
+                row,
+                description=row.get('description', ''),
+                supplier_id=row.get('supplier_id'),
+                stock_quantity=stock_quantity,
+                min_stock_level=min_stock_level,
+                is_low_stock=stock_quantity <= min_stock_level,
+                created_at=now,
+                updated_at=now
+            ))
+        elif mode == 'upsert':
+            values = {field: row[field] for field in UPDATABLE_FIELDS if field in row}
+            stock_quantity = row.get('stock_quantity', current.stock_quantity)
+            min_stock_level = values.get('min_stock_level', current.min_stock_level)
+            values.update(
+                id=current.id,
+                stock_quantity=stock_quantity,
+                is_low_stock=stock_quantity <= min_stock_level,
+                updated_at=now
+            )
+            updates.append(values)
+            if stock_quantity != current.stock_quantity:
+                movements.append(StockMovement.build_row(
+                    current.id, MovementType.ADJUSTMENT, current.stock_quantity, stock_quantity,
+                    reason='Import catalogue', created_by='System', created_at=now
+                ))
+        else:
+            report['errors'].append({'line': line_number, 'reference': row['reference'], 'error': 'Cette référence existe déjà'})
+    
+    try:
+        if new_products:
+            created = db.session.execute(
+                insert(Product).returning(Product.id, Product.stock_quantity, sort_by_parameter_order=True),
+                new_products
+            ).all()
+            movements.extend(
+                StockMovement.build_row(
+                    product_id, MovementType.IN, 0, stock_quantity,
+                    reason='Stock initial', created_by='System', created_at=now
+                )
+                for product_id, stock_quantity in created if stock_quantity > 0
+            )
+        if updates:
+            db.session.execute(update(Product), updates)
+        if movements:
+            CostLayer.record(movements)
+            db.session.execute(insert(StockMovement), movements)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    
+    report['created'] += len(new_products)
+    report['updated'] += len(updates)
+
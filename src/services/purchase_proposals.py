@@ -0,0 +1,148 @@
+import math
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import exists, insert
+from src.models import db, Product, Supplier, Order, OrderItem, OrderStatus, OrderType, OrderSequence
+from src.services.order_workflow import OPEN_STATUSES
+
+# Niveau visé par défaut : deux fois le seuil de stock bas
+DEFAULT_TARGET_MULTIPLIER = 2.0
+
+PROPOSAL_NOTE = 'Proposition automatique de réapprovisionnement'
+
+# Taille des lots d'insertion des articles
+BATCH_SIZE = 1000
+
+def parse_target_multiplier(value):
+    """Valide le multiplicateur du seuil de stock bas donnant le niveau visé"""
+    if value in (None, ''):
+        return DEFAULT_TARGET_MULTIPLIER
+    try:
+        multiplier = float(value)
+    except (TypeError, ValueError):
+        raise ValueError('Le multiplicateur du niveau visé doit être un nombre')
+    if multiplier < 1:
+        raise ValueError('Le multiplicateur du niveau visé doit être au moins 1')
+    return multiplier
+
+def _on_open_purchase():
+    """Condition : le produit figure déjà sur une commande d'achat en cours"""
+    return exists().where(
+        OrderItem.product_id == Product.id,
+        OrderItem.order_id == Order.id,
+        Order.order_type == OrderType.PURCHASE,
+        Order.status.in_(OPEN_STATUSES)
+    )
+
+def propose_purchase_orders(target_multiplier=DEFAULT_TARGET_MULTIPLIER, supplier_id=None, dry_run=False):
+    """Prépare une commande d'achat par fournisseur pour les produits en stock
+    bas qui ne sont pas déjà sur une commande d'achat en cours.
+    
+    La quantité commandée ramène le stock au niveau visé (seuil x
+    multiplicateur, au moins seuil + 1) ; le prix d'achat est le coût moyen
+    pondéré, à défaut le prix unitaire. Hors simulation, les commandes (au
+    statut en attente) et leurs articles sont insérés en masse et numérotés
+    en une réservation de séquence. Retourne le détail des propositions.
+    """
+    query = db.session.query(
+        Product.id, Product.name, Product.reference, Product.stock_quantity,
+        Product.min_stock_level, Product.average_cost, Product.unit_price, Product.supplier_id
+    ).filter(Product.is_low_stock == True, ~_on_open_purchase())
+    if supplier_id is not None:
+        query = query.filter(Product.supplier_id == supplier_id)
+    products = query.order_by(Product.supplier_id, Product.id).all()
+    
+    active_suppliers = dict(db.session.query(Supplier.id, Supplier.name).filter(
+        Supplier.id.in_({product.supplier_id for product in products} - {None}),
+        Supplier.is_active == True
+    ).all())
+    
+    lines_by_supplier = defaultdict(list)
+    skipped = []
+    for product in products:
+        if product.supplier_id is None:
+            skipped.append({'product_id': product.id, 'reference': product.reference, 'reason': 'Aucun fournisseur'})
+            continue
+        if product.supplier_id not in active_suppliers:
+            skipped.append({'product_id': product.id, 'reference': product.reference, 'reason': 'Fournisseur inactif'})
+            continue
+        min_stock_level = product.min_stock_level or 0
+        target = max(math.ceil(min_stock_level * target_multiplier), min_stock_level + 1)
+        quantity = target - (product.stock_quantity or 0)
+        if quantity <= 0:
+            continue
+        unit_price = product.average_cost or product.unit_price
+        lines_by_supplier[product.supplier_id].append({
+            'product_id': product.id,
+            'reference': product.reference,
+            'name': product.name,
+            'stock_quantity': product.stock_quantity,
+            'target_quantity': target,
+            'quantity': quantity,
+            'unit_price': round(unit_price, 4),
+            'total_price': round(quantity * unit_price, 2)
+        })
+    
+    proposals = [
+        {
+            'supplier_id': supplier_id,
+            'supplier_name': active_suppliers[supplier_id],
+            'items': lines,
+            'total_amount': round(sum(line['total_price'] for line in lines), 2)
+        }
+        for supplier_id, lines in lines_by_supplier.items()
+    ]
+    
+    if not dry_run and proposals:
+        _create_orders(proposals)
+    return {
+        'dry_run': dry_run,
+        'target_multiplier': target_multiplier,
+        'orders_count': len(proposals),
+        'items_count': sum(len(proposal['items']) for proposal in proposals),
+        'proposals': proposals,
+        'skipped': skipped
+    }
+
+def _create_orders(proposals):
+    """Insère les commandes proposées et leurs articles en masse, puis valide"""
+    now = datetime.utcnow()
+    numbers = OrderSequence.next_numbers(OrderType.PURCHASE, len(proposals))
+    order_ids = db.session.execute(
+        insert(Order).returning(Order.id, sort_by_parameter_order=True),
+        [
+            {
+                'order_number': number,
+                'order_type': OrderType.PURCHASE,
+                'status': OrderStatus.PENDING,
+                'supplier_id': proposal['supplier_id'],
+                'customer_name': '',
+                'customer_email': '',
+                'customer_phone': '',
+                'order_date': now,
+                'total_amount': proposal['total_amount'],
+                'notes': PROPOSAL_NOTE,
+                'created_at': now,
+                'updated_at': now
+            }
+            for number, proposal in zip(numbers, proposals)
+        ]
+    ).scalars().all()
+    
+    items = []
+    for order_id, number, proposal in zip(order_ids, numbers, proposals):
+        proposal['order_id'] = order_id
+        proposal['order_number'] = number
+        items.extend(
+            {
+                'order_id': order_id,
+                'product_id': line['product_id'],
+                'quantity': line['quantity'],
+                'unit_price': line['unit_price'],
+                'total_price': line['total_price']
+            }
+            for line in proposal['items']
+        )
+    for start in range(0, len(items), BATCH_SIZE):
+        db.session.execute(insert(OrderItem), items[start:start + BATCH_SIZE])
+    db.session.commit()
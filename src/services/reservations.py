@@ -0,0 +1,104 @@
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.orm.attributes import set_committed_value
+from src.models import db, Product, StockReservation, ReservationStatus
+
+def reserve_items(order, items):
+    """Réserve le stock des articles d'une vente (articles déjà flushés).
+
+    Chaque produit est réservé par un UPDATE conditionnel sur la quantité
+    disponible (stock - réservé) : deux ventes simultanées ne peuvent pas
+    réserver la même unité. Lève ValueError si le disponible est insuffisant.
+    """
+    requested = defaultdict(int)
+    for item in items:
+        requested[item.product_id] += item.quantity
+    
+    for product_id, quantity in sorted(requested.items()):
+        statement = update(Product).where(
+            Product.id == product_id,
+            Product.stock_quantity - Product.reserved_quantity >= quantity
+        ).values(
+            reserved_quantity=Product.reserved_quantity + quantity
+        ).returning(Product.reserved_quantity)
+        reserved = db.session.execute(statement, execution_options={'synchronize_session': False}).scalar()
+        if reserved is None:
+            product = db.session.get(Product, product_id)
+            db.session.refresh(product, ['stock_quantity', 'reserved_quantity'])
+            raise ValueError(f'Stock insuffisant pour {product.name} (disponible: {product.available_quantity})')
+        _sync_reserved(product_id, reserved)
+    
+    now = datetime.utcnow()
+    db.session.execute(insert(StockReservation), [
+        {
+            'order_id': order.id,
+            'order_item_id': item.id,
+            'product_id': item.product_id,
+            'quantity': item.quantity,
+            'status': ReservationStatus.ACTIVE,
+            'created_at': now,
+            'updated_at': now
+        }
+        for item in items
+    ])
+
+def release_orders(order_ids):
+    """Libère les réservations actives de commandes annulées ou supprimées"""
+    return _close_reservations(StockReservation.order_id.in_(order_ids), ReservationStatus.RELEASED)
+
+def convert_orders(order_ids):
+    """Solde les réservations de commandes livrées (la sortie de stock est enregistrée à part)"""
+    return _close_reservations(StockReservation.order_id.in_(order_ids), ReservationStatus.CONVERTED)
+
+def discard_order(order_id):
+    """Libère puis supprime les réservations d'une commande supprimée"""
+    _discard(StockReservation.order_id == order_id)
+
+def discard_item(item_id):
+    """Libère puis supprime la réservation d'un article retiré d'une commande"""
+    _discard(StockReservation.order_item_id == item_id)
+
+def _discard(criterion):
+    _close_reservations(criterion, ReservationStatus.RELEASED)
+    StockReservation.query.filter(criterion).delete(synchronize_session=False)
+
+def _close_reservations(criterion, status):
+    """Clôt les réservations actives correspondantes et décrémente les quantités réservées.
+
+    Une requête lit les réservations, une autre change leur statut et un
+    UPDATE executemany décrémente reserved_quantity par produit.
+    """
+    reservations = db.session.query(
+        StockReservation.id, StockReservation.product_id, StockReservation.quantity
+    ).filter(criterion, StockReservation.status == ReservationStatus.ACTIVE).all()
+    if not reservations:
+        return []
+    
+    released = defaultdict(int)
+    for reservation in reservations:
+        released[reservation.product_id] += reservation.quantity
+    
+    db.session.execute(
+        update(StockReservation).where(
+            StockReservation.id.in_([reservation.id for reservation in reservations])
+        ).values(status=status, updated_at=datetime.utcnow()),
+        execution_options={'synchronize_session': False}
+    )
+    db.session.connection().execute(
+        update(Product.__table__).where(Product.__table__.c.id == bindparam('product_id')).values(
+            reserved_quantity=Product.__table__.c.reserved_quantity - bindparam('quantity')
+        ),
+        [{'product_id': product_id, 'quantity': quantity} for product_id, quantity in released.items()]
+    )
+    for product_id in released:
+        product = db.session.identity_map.get(db.session.identity_key(Product, product_id))
+        if product is not None:
+            db.session.expire(product, ['reserved_quantity'])
+    return reservations
+
+def _sync_reserved(product_id, reserved):
+    """Reporte la nouvelle quantité réservée sur l'objet chargé, sans le marquer modifié"""
+    product = db.session.identity_map.get(db.session.identity_key(Product, product_id))
+    if product is not None:
+        set_committed_value(product, 'reserved_quantity', reserved)
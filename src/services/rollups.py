@@ -0,0 +1,274 @@
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import and_, delete, func, or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from src.models import (
+    db, Order, OrderItem, OrderStatus, Product, Supplier,
+    DailyOrderRollup, DailyProductRollup, DailySupplierRollup
+)
+
+ROLLUP_MODELS = (DailyOrderRollup, DailyProductRollup, DailySupplierRollup)
+
+def _order_day(order):
+    return (order.order_date or order.created_at or datetime.utcnow()).date()
+
+def _upsert(model, keys, counters, rows):
+    """Ajoute des écarts aux compteurs des lignes d'agrégat (INSERT ... ON CONFLICT DO UPDATE)"""
+    if not rows:
+        return
+    table = model.__table__
+    statement = sqlite_insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=keys,
+        set_={counter: table.c[counter] + statement.excluded[counter] for counter in counters}
+    )
+    db.session.execute(statement, rows)
+
+def record_orders(orders, sign=1):
+    """Ajoute (sign=1) ou retire (sign=-1) des commandes livrées des agrégats
+    journaliers, dans la transaction courante. Les lignes d'articles doivent
+    être chargées (preload_order_items pour un lot)."""
+    if not orders:
+        return
+    by_day = defaultdict(lambda: [0, 0.0])
+    by_product = defaultdict(lambda: [0, 0.0])
+    by_supplier = defaultdict(lambda: [0, 0.0])
+    
+    for order in orders:
+        day = _order_day(order)
+        amount = sign * (order.total_amount or 0.0)
+        totals = by_day[(order.order_type, day)]
+        totals[0] += sign
+        totals[1] += amount
+        if order.supplier_id is not None:
+            totals = by_supplier[(order.order_type, day, order.supplier_id)]
+            totals[0] += sign
+            totals[1] += amount
+        for item in order.order_items:
+            totals = by_product[(order.order_type, day, item.product_id)]
+            totals[0] += sign * item.quantity
+            totals[1] += sign * item.total_price
+    
+    _upsert(DailyOrderRollup, ['order_type', 'day'], ['order_count', 'total_amount'], [
+        {'order_type': order_type, 'day': day, 'order_count': count, 'total_amount': amount}
+        for (order_type, day), (count, amount) in by_day.items()
+    ])
+    _upsert(DailyProductRollup, ['order_type', 'day', 'product_id'], ['quantity', 'total_amount'], [
+        {'order_type': order_type, 'day': day, 'product_id': product_id, 'quantity': quantity, 'total_amount': amount}
+        for (order_type, day, product_id), (quantity, amount) in by_product.items()
+    ])
+    _upsert(DailySupplierRollup, ['order_type', 'day', 'supplier_id'], ['order_count', 'total_amount'], [
+        {'order_type': order_type, 'day': day, 'supplier_id': supplier_id, 'order_count': count, 'total_amount': amount}
+        for (order_type, day, supplier_id), (count, amount) in by_supplier.items()
+    ])
+    
+    if sign < 0:
+        # Lignes vidées par l'annulation : supprimées pour ne pas apparaître dans les classements
+        days = {day for _, day in by_day}
+        db.session.execute(delete(DailyOrderRollup).where(DailyOrderRollup.day.in_(days), DailyOrderRollup.order_count <= 0))
+        db.session.execute(delete(DailyProductRollup).where(DailyProductRollup.day.in_(days), DailyProductRollup.quantity <= 0))
+        db.session.execute(delete(DailySupplierRollup).where(DailySupplierRollup.day.in_(days), DailySupplierRollup.order_count <= 0))
+
+def update_rollups(orders, old_status, new_status):
+    """Effet d'un changement de statut sur les agrégats : ajout à la livraison,
+    retrait quand une commande livrée change de statut (annulation)."""
+    if new_status == OrderStatus.DELIVERED and old_status != OrderStatus.DELIVERED:
+        record_orders(orders, 1)
+    elif old_status == OrderStatus.DELIVERED and new_status != OrderStatus.DELIVERED:
+        record_orders(orders, -1)
+
+def rebuild_rollups():
+    """Recalcule tous les agrégats à partir de l'historique des commandes livrées.
+    Retourne le nombre de lignes d'agrégat écrites."""
+    for model in ROLLUP_MODELS:
+        db.session.execute(delete(model))
+    
+    day = func.date(Order.order_date)
+    delivered = Order.status == OrderStatus.DELIVERED
+    order_rows = db.session.query(
+        Order.order_type, day, func.count(Order.id), func.coalesce(func.sum(Order.total_amount), 0)
+    ).filter(delivered).group_by(Order.order_type, day).all()
+    product_rows = db.session.query(
+        Order.order_type, day, OrderItem.product_id, func.sum(OrderItem.quantity), func.sum(OrderItem.total_price)
+    ).join(OrderItem, OrderItem.order_id == Order.id).filter(delivered).group_by(
+        Order.order_type, day, OrderItem.product_id
+    ).all()
+    supplier_rows = db.session.query(
+        Order.order_type, day, Order.supplier_id, func.count(Order.id), func.coalesce(func.sum(Order.total_amount), 0)
+    ).filter(delivered, Order.supplier_id.isnot(None)).group_by(Order.order_type, day, Order.supplier_id).all()
+    
+    _upsert(DailyOrderRollup, ['order_type', 'day'], ['order_count', 'total_amount'], [
+        {'order_type': order_type, 'day': date.fromisoformat(day), 'order_count': count, 'total_amount': amount}
+        for order_type, day, count, amount in order_rows
+    ])
+    _upsert(DailyProductRollup, ['order_type', 'day', 'product_id'], ['quantity', 'total_amount'], [
+        {'order_type': order_type, 'day': date.fromisoformat(day), 'product_id': product_id, 'quantity': quantity, 'total_amount': amount}
+        for order_type, day, product_id, quantity, amount in product_rows
+    ])
+    _upsert(DailySupplierRollup, ['order_type', 'day', 'supplier_id'], ['order_count', 'total_amount'], [
+        {'order_type': order_type, 'day': date.fromisoformat(day), 'supplier_id': supplier_id, 'order_count': count, 'total_amount': amount}
+        for order_type, day, supplier_id, count, amount in supplier_rows
+    ])
+    db.session.commit()
+    return len(order_rows) + len(product_rows) + len(supplier_rows)
+
+def ensure_rollups():
+    """Initialise les agrégats d'une base existante qui n'en a pas encore"""
+    if db.session.query(DailyOrderRollup.day).first() is not None:
+        return
+    if db.session.query(Order.id).filter(Order.status == OrderStatus.DELIVERED).first() is None:
+        return
+    rebuild_rollups()
+
+def _split_range(start, end):
+    """Découpe la période [start, end] en jours complets, servis par les agrégats,
+    et en portions de journée aux bornes, servies par les tables brutes.
+    Retourne (premier jour, dernier jour, conditions sur order_date) ; les jours
+    valent None quand la période ne contient aucun jour complet."""
+    first_day = last_day = None
+    partial = []
+    
+    if start is not None:
+        first_day = start.date() if start.time() == time.min else start.date() + timedelta(days=1)
+    if end is not None:
+        last_day = end.date() - timedelta(days=1)
+    
+    if first_day is not None and last_day is not None and first_day > last_day:
+        return None, None, [and_(Order.order_date >= start, Order.order_date <= end)]
+    
+    if start is not None and start.time() != time.min:
+        partial.append(and_(Order.order_date >= start, Order.order_date < datetime.combine(first_day, time.min)))
+    if end is not None:
+        partial.append(and_(Order.order_date >= datetime.combine(end.date(), time.min), Order.order_date <= end))
+    return first_day, last_day, partial
+
+def _rollup_filters(model, order_type, first_day, last_day):
+    filters = [model.order_type == order_type]
+    if first_day is not None:
+        filters.append(model.day >= first_day)
+    if last_day is not None:
+        filters.append(model.day <= last_day)
+    return filters
+
+def _raw_orders(query, order_type, partial):
+    return query.filter(
+        Order.order_type == order_type,
+        Order.status == OrderStatus.DELIVERED,
+        or_(*partial)
+    )
+
+def order_summary(order_type, start=None, end=None, supplier_id=None):
+    """Montant total et nombre de commandes livrées sur la période"""
+    first_day, last_day, partial = _split_range(start, end)
+    total_amount, total_orders = 0.0, 0
+    
+    if first_day is not None or last_day is not None or not partial:
+        model = DailySupplierRollup if supplier_id is not None else DailyOrderRollup
+        query = db.session.query(
+            func.coalesce(func.sum(model.total_amount), 0),
+            func.coalesce(func.sum(model.order_count), 0)
+        ).filter(*_rollup_filters(model, order_type, first_day, last_day))
+        if supplier_id is not None:
+            query = query.filter(model.supplier_id == supplier_id)
+        amount, count = query.one()
+        total_amount += float(amount)
+        total_orders += int(count)
+    
+    if partial:
+        query = _raw_orders(db.session.query(
+            func.coalesce(func.sum(Order.total_amount), 0),
+            func.count(Order.id)
+        ), order_type, partial)
+        if supplier_id is not None:
+            query = query.filter(Order.supplier_id == supplier_id)
+        amount, count = query.one()
+        total_amount += float(amount)
+        total_orders += int(count)
+    
+    return total_amount, total_orders
+
+def product_totals(order_type, start=None, end=None):
+    """Quantité et montant des commandes livrées sur la période, par produit
+    ({product_id: [quantité, montant]})"""
+    first_day, last_day, partial = _split_range(start, end)
+    totals = defaultdict(lambda: [0, 0.0])
+    
+    rows = []
+    if first_day is not None or last_day is not None or not partial:
+        rows += db.session.query(
+            DailyProductRollup.product_id,
+            func.sum(DailyProductRollup.quantity),
+            func.sum(DailyProductRollup.total_amount)
+        ).filter(
+            *_rollup_filters(DailyProductRollup, order_type, first_day, last_day)
+        ).group_by(DailyProductRollup.product_id).all()
+    if partial:
+        rows += _raw_orders(db.session.query(
+            OrderItem.product_id,
+            func.sum(OrderItem.quantity),
+            func.sum(OrderItem.total_price)
+        ).join(Order, OrderItem.order_id == Order.id), order_type, partial).group_by(OrderItem.product_id).all()
+    
+    for product_id, quantity, amount in rows:
+        totals[product_id][0] += int(quantity)
+        totals[product_id][1] += float(amount)
+    return totals
+
+def top_products(order_type, start=None, end=None, limit=10):
+    """Produits les plus vendus (ou achetés) sur la période, par quantité"""
+    totals = product_totals(order_type, start, end)
+    ranked = sorted(
+        (entry for entry in totals.items() if entry[1][0] > 0),
+        key=lambda entry: (-entry[1][0], entry[0])
+    )[:limit]
+    products = {product.id: product for product in Product.query.filter(Product.id.in_([product_id for product_id, _ in ranked])).all()}
+    return [
+        {
+            'name': products[product_id].name,
+            'reference': products[product_id].reference,
+            'quantity': quantity,
+            'total_amount': round(amount, 2)
+        }
+        for product_id, (quantity, amount) in ranked
+        if product_id in products
+    ]
+
+def top_suppliers(order_type, start=None, end=None, limit=10):
+    """Fournisseurs classés par montant des commandes livrées sur la période"""
+    first_day, last_day, partial = _split_range(start, end)
+    totals = defaultdict(lambda: [0, 0.0])
+    
+    rows = []
+    if first_day is not None or last_day is not None or not partial:
+        rows += db.session.query(
+            DailySupplierRollup.supplier_id,
+            func.sum(DailySupplierRollup.order_count),
+            func.sum(DailySupplierRollup.total_amount)
+        ).filter(
+            *_rollup_filters(DailySupplierRollup, order_type, first_day, last_day)
+        ).group_by(DailySupplierRollup.supplier_id).all()
+    if partial:
+        rows += _raw_orders(db.session.query(
+            Order.supplier_id,
+            func.count(Order.id),
+            func.coalesce(func.sum(Order.total_amount), 0)
+        ), order_type, partial).filter(Order.supplier_id.isnot(None)).group_by(Order.supplier_id).all()
+    
+    for supplier_id, count, amount in rows:
+        totals[supplier_id][0] += int(count)
+        totals[supplier_id][1] += float(amount)
+    
+    ranked = sorted(
+        (entry for entry in totals.items() if entry[1][0] > 0),
+        key=lambda entry: (-entry[1][1], entry[0])
+    )[:limit]
+    suppliers = {supplier.id: supplier for supplier in Supplier.query.filter(Supplier.id.in_([supplier_id for supplier_id, _ in ranked])).all()}
+    return [
+        {
+            'name': suppliers[supplier_id].name,
+            'order_count': count,
+            'total_amount': round(amount, 2)
+        }
+        for supplier_id, (count, amount) in ranked
+        if supplier_id in suppliers
+    ]
@@ -0,0 +1,103 @@
+import re
+from sqlalchemy import Float, Integer, column, table, text
+from sqlalchemy.exc import OperationalError
+from src.models import db
+
+# Index plein texte FTS5 (table à contenu externe adossée à products)
+FTS_TABLE = 'products_fts'
+
+products_fts = table(
+    FTS_TABLE,
+    column('rowid', Integer),
+    column('rank', Float),
+    column(FTS_TABLE)
+)
+
+_CREATE_STATEMENTS = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, reference, description,
+        content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON products BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, reference, description)
+        VALUES (new.id, new.name, new.reference, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON products BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, reference, description)
+        VALUES ('delete', old.id, old.name, old.reference, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, reference, description ON products BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, reference, description)
+        VALUES ('delete', old.id, old.name, old.reference, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, reference, description)
+        VALUES (new.id, new.name, new.reference, new.description);
+    END"""
+]
+
+_DROP_STATEMENTS = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}'
+]
+
+# Disponibilité de l'index par base (clé : URL du moteur)
+_availability = {}
+
+def ensure_search_index():
+    """Crée l'index FTS5 et ses triggers s'ils n'existent pas (SQLite uniquement)"""
+    engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        _availability[str(engine.url)] = False
+        return False
+    
+    try:
+        with engine.begin() as connection:
+            exists = connection.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {'name': FTS_TABLE}
+            ).first() is not None
+            for statement in _CREATE_STATEMENTS:
+                connection.execute(text(statement))
+            if not exists:
+                # Pertinence : le nom pèse plus que la référence, elle-même plus que la description
+                connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', 'bm25(10.0, 5.0, 1.0)')"))
+                connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        available = True
+    except OperationalError:
+        # SQLite compilé sans FTS5 : la recherche reste en ilike
+        available = False
+    
+    _availability[str(engine.url)] = available
+    return available
+
+def rebuild_search_index():
+    """Reconstruit entièrement l'index à partir de la table products"""
+    engine = db.engine
+    with engine.begin() as connection:
+        for statement in _DROP_STATEMENTS:
+            connection.execute(text(statement))
+    _availability.pop(str(engine.url), None)
+    return ensure_search_index()
+
+def search_index_available():
+    """Indique si la base courante dispose de l'index FTS5"""
+    key = str(db.engine.url)
+    if key not in _availability:
+        return ensure_search_index()
+    return _availability[key]
+
+def build_match_query(search):
+    """Traduit une saisie libre en requête FTS5 : tous les mots, en préfixe"""
+    tokens = re.findall(r'\w+', search, flags=re.UNICODE)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+def matching_products(search):
+    """Sous-requête (product_id, rank) des produits correspondant à la recherche"""
+    return db.select(
+        products_fts.c.rowid.label('product_id'),
+        products_fts.c.rank.label('rank')
+    ).where(
+        products_fts.c[FTS_TABLE].op('MATCH')(build_match_query(search))
+    ).subquery('matches')
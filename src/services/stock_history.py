@@ -0,0 +1,81 @@
+from datetime import datetime
+from sqlalchemy import func, insert, literal, select
+from src.models import db, Product, StockMovement, StockSnapshot
+
+def take_snapshot(taken_at=None):
+    """Enregistre le stock courant de tous les produits comme point de contrôle,
+    en une instruction INSERT ... SELECT. Retourne (date, nombre de produits)."""
+    taken_at = taken_at or datetime.utcnow()
+    result = db.session.execute(
+        insert(StockSnapshot).from_select(
+            ['taken_at', 'product_id', 'stock_quantity'],
+            select(literal(taken_at, type_=db.DateTime), Product.id, Product.stock_quantity)
+        )
+    )
+    db.session.commit()
+    return taken_at, result.rowcount
+
+def _ledger_deltas(after, until, product_id=None):
+    """Écart de stock cumulé par produit des mouvements de l'intervalle ]after, until]
+    (bornes None : intervalle ouvert)"""
+    query = db.session.query(
+        StockMovement.product_id,
+        func.sum(StockMovement.new_stock - StockMovement.previous_stock)
+    )
+    if until is not None:
+        query = query.filter(StockMovement.created_at <= until)
+    if after is not None:
+        query = query.filter(StockMovement.created_at > after)
+    if product_id is not None:
+        query = query.filter(StockMovement.product_id == product_id)
+    return dict(query.group_by(StockMovement.product_id).all())
+
+def _snapshot(taken_at, product_id=None):
+    query = db.session.query(StockSnapshot.product_id, StockSnapshot.stock_quantity).filter(
+        StockSnapshot.taken_at == taken_at
+    )
+    if product_id is not None:
+        query = query.filter(StockSnapshot.product_id == product_id)
+    return dict(query.all())
+
+def stock_as_of(as_of, product_id=None):
+    """Stock de chaque produit à la date as_of.
+    
+    Part du dernier point de contrôle antérieur et y ajoute les mouvements
+    suivants jusqu'à as_of. Sans point de contrôle antérieur, part du suivant
+    (ou du stock courant) et retranche les mouvements postérieurs à as_of :
+    seule la portion du journal entre as_of et le point de contrôle est lue.
+    Retourne (point de contrôle utilisé ou None pour le stock courant,
+    {product_id: quantité}).
+    """
+    before = db.session.query(func.max(StockSnapshot.taken_at)).filter(
+        StockSnapshot.taken_at <= as_of
+    ).scalar()
+    
+    if before is not None:
+        quantities = _snapshot(before, product_id)
+        for pid, delta in _ledger_deltas(before, as_of, product_id).items():
+            quantities[pid] = quantities.get(pid, 0) + delta
+        return before, quantities
+    
+    after = db.session.query(func.min(StockSnapshot.taken_at)).filter(
+        StockSnapshot.taken_at > as_of
+    ).scalar()
+    if after is not None:
+        quantities = _snapshot(after, product_id)
+        until = after
+    else:
+        query = db.session.query(Product.id, Product.stock_quantity)
+        if product_id is not None:
+            query = query.filter(Product.id == product_id)
+        quantities = dict(query.all())
+        until = None
+    
+    for pid, delta in _ledger_deltas(as_of, until, product_id).items():
+        quantities[pid] = quantities.get(pid, 0) - delta
+    
+    # Produits créés après la date demandée
+    created_later = db.session.query(Product.id).filter(Product.created_at > as_of)
+    for (pid,) in created_later.all():
+        quantities.pop(pid, None)
+    return after, quantities
@@ -0,0 +1,39 @@
+import json
+from flask import Response, request, stream_with_context
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+STREAM_BATCH_SIZE = 500
+
+def wants_stream():
+    """Le client demande-t-il une réponse NDJSON en flux (stream=1 ou Accept) ?"""
+    if request.args.get('stream', '').lower() in ('1', 'true'):
+        return True
+    return request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+def stream_ndjson(query, serialize_batch, header=None, batch_size=STREAM_BATCH_SIZE):
+    """Diffuse les résultats d'une requête ORM en NDJSON, un objet par ligne.
+
+    La requête est parcourue avec yield_per et sérialisée par lots : la
+    mémoire reste constante quelle que soit la taille du résultat. Une
+    éventuelle ligne d'en-tête (résumé) est émise en premier.
+    """
+    def generate():
+        if header is not None:
+            yield _line(header)
+        batch = []
+        try:
+            for instance in query.yield_per(batch_size):
+                batch.append(instance)
+                if len(batch) >= batch_size:
+                    yield ''.join(_line(row) for row in serialize_batch(batch))
+                    batch = []
+            if batch:
+                yield ''.join(_line(row) for row in serialize_batch(batch))
+        except Exception as e:
+            # Les en-têtes HTTP sont déjà partis : l'erreur est signalée dans le flux
+            yield _line({'success': False, 'error': str(e)})
+    
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+def _line(payload):
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')) + '\n'
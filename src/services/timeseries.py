@@ -0,0 +1,119 @@
+from datetime import datetime, time, timedelta
+from sqlalchemy import func
+from src.models import db, Order, OrderItem, OrderStatus, Product, Supplier
+
+BUCKETS = ('day', 'week', 'month')
+BREAKDOWNS = ('category', 'supplier')
+
+# Nombre maximal de périodes d'une série
+MAX_BUCKETS = 1000
+
+# Période couverte par défaut (sans paramètre start)
+DEFAULT_SPANS = {'day': 30, 'week': 12, 'month': 12}
+
+def bucket_expression(bucket, column):
+    """Début de période d'une date, calculé en SQL (format AAAA-MM-JJ).
+    Les semaines commencent le lundi."""
+    if bucket == 'day':
+        return func.date(column)
+    if bucket == 'week':
+        return func.date(column, '-6 days', 'weekday 1')
+    return func.strftime('%Y-%m-01', column)
+
+def bucket_start(bucket, day):
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+def next_bucket(bucket, day):
+    if bucket == 'day':
+        return day + timedelta(days=1)
+    if bucket == 'week':
+        return day + timedelta(days=7)
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+def default_start(bucket, end):
+    """Début par défaut : les DEFAULT_SPANS[bucket] dernières périodes"""
+    start = bucket_start(bucket, end.date())
+    for _ in range(DEFAULT_SPANS[bucket] - 1):
+        start = bucket_start(bucket, start - timedelta(days=1))
+    return datetime.combine(start, time.min)
+
+def periods(bucket, start, end):
+    """Débuts de toutes les périodes de [start, end], pour compléter les trous"""
+    keys = []
+    current = bucket_start(bucket, start.date())
+    while current <= end.date():
+        keys.append(current.isoformat())
+        if len(keys) > MAX_BUCKETS:
+            raise ValueError(f'Période trop longue : au plus {MAX_BUCKETS} intervalles')
+        current = next_bucket(bucket, current)
+    return keys
+
+def order_timeseries(order_type, bucket, start, end, breakdown=None):
+    """Montant et nombre de commandes livrées par période, avec les périodes
+    vides à zéro ; ventilation facultative du montant des articles par
+    catégorie ou par fournisseur du produit."""
+    keys = periods(bucket, start, end)
+    period = bucket_expression(bucket, Order.order_date)
+    filters = (
+        Order.order_type == order_type,
+        Order.status == OrderStatus.DELIVERED,
+        Order.order_date >= start,
+        Order.order_date <= end
+    )
+    
+    rows = db.session.query(
+        period.label('period'),
+        func.coalesce(func.sum(Order.total_amount), 0),
+        func.count(Order.id)
+    ).filter(*filters).group_by(period).all()
+    totals = {key: (float(amount), count) for key, amount, count in rows}
+    
+    result = {
+        'series': [
+            {
+                'period': key,
+                'total_amount': round(totals.get(key, (0.0, 0))[0], 2),
+                'order_count': totals.get(key, (0.0, 0))[1]
+            }
+            for key in keys
+        ]
+    }
+    
+    if breakdown:
+        group = Product.category if breakdown == 'category' else Product.supplier_id
+        rows = db.session.query(
+            period.label('period'),
+            group,
+            func.coalesce(func.sum(OrderItem.total_price), 0),
+            func.coalesce(func.sum(OrderItem.quantity), 0)
+        ).join(OrderItem, OrderItem.order_id == Order.id).join(
+            Product, Product.id == OrderItem.product_id
+        ).filter(*filters).group_by(period, group).all()
+        
+        names = {}
+        if breakdown == 'supplier':
+            supplier_ids = {row[1] for row in rows} - {None}
+            names = dict(db.session.query(Supplier.id, Supplier.name).filter(Supplier.id.in_(supplier_ids)).all())
+        
+        values = {}
+        for key, group_value, amount, quantity in rows:
+            label = names.get(group_value) if breakdown == 'supplier' else group_value
+            values.setdefault((group_value, label), {})[key] = (float(amount), int(quantity))
+        
+        result['breakdown'] = sorted(
+            (
+                {
+                    'key': group_value,
+                    'label': label,
+                    'total_amount': [round(points.get(key, (0.0, 0))[0], 2) for key in keys],
+                    'quantity': [points.get(key, (0.0, 0))[1] for key in keys]
+                }
+                for (group_value, label), points in values.items()
+            ),
+            key=lambda entry: -sum(entry['total_amount'])
+        )
+    return result
@@ -0,0 +1,146 @@
+from collections import deque
+from sqlalchemy import bindparam, delete, func, insert, update
+from src.models import db, Product, StockMovement, CostLayer
+from src.models.cost_layer import apply_cost_movement
+
+# Taille des lots de lecture du journal et d'insertion des couches
+BATCH_SIZE = 1000
+
+def rebuild_cost_layers():
+    """Recalcule les couches FIFO et le coût moyen pondéré de tous les produits
+    en un seul parcours du journal, trié par produit puis par date.
+
+    Le stock présent avant le premier mouvement d'un produit (previous_stock
+    de ce mouvement) est repris comme couche d'ouverture au prix unitaire, qui
+    sert aussi de coût moyen initial ; un écart restant entre le journal et le
+    stock courant est couvert de la même façon. Retourne le nombre de couches
+    écrites.
+    """
+    db.session.execute(delete(CostLayer))
+    products = {
+        row.id: row for row in db.session.query(
+            Product.id, Product.stock_quantity, Product.unit_price, Product.created_at
+        ).all()
+    }
+    averages = {}
+    pending = []
+    written = 0
+    
+    def finish(product_id, layers, average):
+        nonlocal written
+        product = products.get(product_id)
+        if product is None:
+            return
+        stock = product.stock_quantity or 0
+        layered = sum(layer['remaining_quantity'] for layer in layers)
+        if stock > layered:
+            layers.appendleft({
+                'product_id': product_id,
+                'unit_cost': average or product.unit_price,
+                'quantity': stock - layered,
+                'remaining_quantity': stock - layered,
+                'received_at': product.created_at
+            })
+            average = (layered * average + (stock - layered) * (average or product.unit_price)) / stock
+        elif stock < layered:
+            apply_cost_movement(product_id, layers, average, layered, stock, None, None, None, [], {})
+        averages[product_id] = average
+        pending.extend(layer for layer in layers if layer['remaining_quantity'] > 0)
+        if len(pending) >= BATCH_SIZE:
+            written += _insert_layers(pending)
+    
+    ledger = db.session.query(
+        StockMovement.product_id, StockMovement.previous_stock, StockMovement.new_stock,
+        StockMovement.unit_cost, StockMovement.created_at
+    ).order_by(StockMovement.product_id, StockMovement.created_at, StockMovement.id).yield_per(BATCH_SIZE)
+    
+    current, layers, average = None, deque(), 0.0
+    for row in ledger:
+        product = products.get(row.product_id)
+        unit_price = product.unit_price if product is not None else None
+        if row.product_id != current:
+            if current is not None:
+                finish(current, layers, average)
+            current, layers, average = row.product_id, deque(), unit_price or 0.0
+            # Stock antérieur au journal : couche d'ouverture au prix unitaire
+            if row.previous_stock > 0:
+                layers.append({
+                    'id': None,
+                    'product_id': current,
+                    'unit_cost': average,
+                    'quantity': row.previous_stock,
+                    'remaining_quantity': row.previous_stock,
+                    'received_at': product.created_at if product is not None else row.created_at
+                })
+        average = apply_cost_movement(
+            current, layers, average, row.previous_stock, row.new_stock,
+            row.unit_cost, unit_price, row.created_at, [], {}
+        )
+    if current is not None:
+        finish(current, layers, average)
+    
+    # Produits sans mouvement
+    for product_id in products.keys() - averages.keys():
+        finish(product_id, deque(), 0.0)
+    written += _insert_layers(pending)
+    
+    # updated_at reporté tel quel : un coût recalculé n'est pas une modification du produit
+    products_table = Product.__table__
+    statement = update(products_table).where(products_table.c.id == bindparam('product_id')).values(
+        average_cost=bindparam('average'),
+        updated_at=products_table.c.updated_at
+    )
+    rows = [{'product_id': product_id, 'average': average} for product_id, average in averages.items()]
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(statement, rows[start:start + BATCH_SIZE])
+    db.session.commit()
+    return written
+
+def _insert_layers(pending):
+    count = len(pending)
+    if pending:
+        db.session.execute(insert(CostLayer), [
+            {key: layer[key] for key in ('product_id', 'unit_cost', 'quantity', 'remaining_quantity', 'received_at')}
+            for layer in pending
+        ])
+        pending.clear()
+    return count
+
+def ensure_cost_layers():
+    """Initialise les couches de coût d'une base existante qui n'en a pas encore"""
+    if db.session.query(CostLayer.id).first() is not None:
+        return
+    if db.session.query(Product.id).filter(Product.stock_quantity > 0).first() is None:
+        return
+    rebuild_cost_layers()
+
+def stock_valuation(category=None):
+    """Valorisation du stock de chaque produit en une requête : coût moyen
+    pondéré, FIFO (somme des couches restantes) et prix de vente"""
+    layers = db.session.query(
+        CostLayer.product_id,
+        func.sum(CostLayer.remaining_quantity * CostLayer.unit_cost).label('fifo_value')
+    ).group_by(CostLayer.product_id).subquery()
+    
+    query = db.session.query(
+        Product.id, Product.name, Product.reference, Product.category,
+        Product.stock_quantity, Product.average_cost, Product.unit_price,
+        func.coalesce(layers.c.fifo_value, 0).label('fifo_value')
+    ).outerjoin(layers, layers.c.product_id == Product.id)
+    if category:
+        query = query.filter(Product.category == category)
+    
+    return [
+        {
+            'product_id': row.id,
+            'name': row.name,
+            'reference': row.reference,
+            'category': row.category,
+            'stock_quantity': row.stock_quantity,
+            'average_cost': round(row.average_cost or 0.0, 4),
+            'weighted_average_value': round((row.stock_quantity or 0) * (row.average_cost or 0.0), 2),
+            'fifo_value': round(float(row.fifo_value), 2),
+            'retail_value': round((row.stock_quantity or 0) * row.unit_price, 2)
+        }
+        for row in query.order_by(Product.name).all()
+    ]
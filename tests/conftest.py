@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Racine du projet dans le chemin d'import, comme src/main.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,85 @@
+import threading
+import pytest
+from flask import Flask
+from sqlalchemy.exc import OperationalError
+from src.models import db, Product, StockMovement, MovementType
+
+INITIAL_STOCK = 50
+THREADS = 8
+ATTEMPTS_PER_THREAD = 15
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'test.db'}"
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 30}}
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add(Product(
+            name='Vis', category='Visserie', reference='VIS-001', unit_price=2.0,
+            stock_quantity=INITIAL_STOCK, min_stock_level=5
+        ))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+def sell_one(product_id):
+    """Une sortie d'une unité ; True si vendue, False si stock insuffisant"""
+    while True:
+        try:
+            product = db.session.get(Product, product_id)
+            movement = StockMovement.create_movement(product, MovementType.OUT, 1, reason='Vente')
+            db.session.add(movement)
+            db.session.commit()
+            return True
+        except ValueError:
+            db.session.rollback()
+            return False
+        except OperationalError:
+            # Base verrouillée par un autre écrivain : on retente
+            db.session.rollback()
+
+def test_concurrent_sales_never_oversell(app):
+    with app.app_context():
+        product_id = Product.query.filter_by(reference='VIS-001').one().id
+    
+    sold = []
+    refused = []
+    errors = []
+    barrier = threading.Barrier(THREADS)
+    
+    def worker():
+        try:
+            with app.app_context():
+                barrier.wait()
+                for _ in range(ATTEMPTS_PER_THREAD):
+                    (sold if sell_one(product_id) else refused).append(1)
+        except Exception as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert not errors
+    assert len(sold) == INITIAL_STOCK
+    assert len(refused) == THREADS * ATTEMPTS_PER_THREAD - INITIAL_STOCK
+    
+    with app.app_context():
+        product = db.session.get(Product, product_id)
+        assert product.stock_quantity == 0
+        assert product.is_low_stock
+        
+        movements = StockMovement.query.filter_by(product_id=product_id).order_by(StockMovement.id).all()
+        assert len(movements) == INITIAL_STOCK
+        expected_previous = INITIAL_STOCK
+        for movement in movements:
+            assert movement.previous_stock == expected_previous
+            assert movement.new_stock == movement.previous_stock - movement.quantity
+            assert movement.new_stock >= 0
+            expected_previous = movement.new_stock
+        assert expected_previous == 0